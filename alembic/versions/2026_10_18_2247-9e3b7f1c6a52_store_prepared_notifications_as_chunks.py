@@ -0,0 +1,40 @@
+"""store prepared notifications as chunks
+
+Revision ID: 9e3b7f1c6a52
+Revises: 2c9d4e7b8a15
+Create Date: 2026-10-18 22:47:31.904417
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "9e3b7f1c6a52"
+down_revision: Union[str, None] = "2c9d4e7b8a15"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Подготовленные уведомления пересчитываются при каждом обновлении
+    # тарифов, поэтому старые тексты не переносятся
+    op.execute("DELETE FROM prepared_notifications")
+    op.drop_column("prepared_notifications", "text")
+    op.add_column(
+        "prepared_notifications",
+        sa.Column("chunks", sa.ARRAY(sa.Text()), nullable=True),
+    )
+
+
+def downgrade() -> None:
+    op.add_column(
+        "prepared_notifications",
+        sa.Column("text", sa.Text(), nullable=True),
+    )
+    op.execute(
+        "UPDATE prepared_notifications SET text = array_to_string(chunks, '')"
+    )
+    op.drop_column("prepared_notifications", "chunks")
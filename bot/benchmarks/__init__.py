@@ -0,0 +1,7 @@
+"""
+Бенчмарки конвейера обработки данных продавца.
+
+Запуск из каталога bot: python -m benchmarks.<module>. Синтетические данные
+продавцов генерирует benchmarks.synthetic, результаты сохраняет и сравнивает
+benchmarks.results
+"""
@@ -0,0 +1,183 @@
+"""
+Локальная замена API Wildberries для нагрузочного тестирования без
+настоящих токенов и лимитов. Отдает синтетические данные
+benchmarks.synthetic, общие для всех токенов:
+
+    POST /content/v2/get/cards/list   карточки с постраничным курсором
+    GET  /api/v1/supplier/stocks      остатки, измененные после dateFrom
+    GET  /api/v3/offices              склады
+
+Задержка ответа, доля ответов 429 и размер карточек настраиваются:
+
+    python -m benchmarks.fake_wb --port 8081 --skus 5000 --latency 0.2 \\
+        --rate-limit-share 0.05 --card-padding 2000
+
+Бот и benchmarks.load направляются на сервер переменными окружения
+WB_SUPPLIERS_API_URL и WB_STATISTICS_API_URL.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import random
+from dataclasses import dataclass
+
+from aiohttp import web
+
+from benchmarks.synthetic import (
+    make_cards,
+    make_stocks,
+    make_warehouses,
+    parse_date,
+)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PORT = 8081
+
+
+@dataclass
+class FaultsConfig:
+    latency: float = 0
+    latency_jitter: float = 0
+    rate_limit_share: float = 0
+    retry_after: float = 1
+
+
+class FakeWildberries:
+    """
+    Приложение aiohttp с данными одного синтетического продавца
+    """
+
+    def __init__(
+        self,
+        skus: int,
+        warehouses_count: int,
+        warehouses_per_card: int = 5,
+        card_padding: int = 0,
+        faults: FaultsConfig | None = None,
+    ):
+        self.faults = faults or FaultsConfig()
+        self.warehouses = make_warehouses(warehouses_count)
+        self.cards = make_cards(skus)
+        for card in self.cards:
+            card["description"] += "x" * card_padding
+        self.positions = {
+            card["nmID"]: position for position, card in enumerate(self.cards)
+        }
+        self.stocks = make_stocks(
+            self.cards, self.warehouses, warehouses_per_card
+        )
+        self.stocks_dates = [
+            parse_date(stock["lastChangeDate"]) for stock in self.stocks
+        ]
+        self.requests_count = 0
+        self.rate_limited_count = 0
+
+    def create_app(self) -> web.Application:
+        app = web.Application(middlewares=[self.faults_middleware])
+        app.router.add_post("/content/v2/get/cards/list", self.cards_list)
+        app.router.add_get("/api/v1/supplier/stocks", self.supplier_stocks)
+        app.router.add_get("/api/v3/offices", self.offices)
+        return app
+
+    @web.middleware
+    async def faults_middleware(self, request: web.Request, handler):
+        self.requests_count += 1
+        if not request.headers.get("Authorization"):
+            return web.json_response(
+                {"title": "unauthorized"}, status=401
+            )
+        delay = self.faults.latency + random.uniform(
+            0, self.faults.latency_jitter
+        )
+        if delay:
+            await asyncio.sleep(delay)
+        if random.random() < self.faults.rate_limit_share:
+            self.rate_limited_count += 1
+            return web.json_response(
+                {"title": "too many requests"},
+                status=429,
+                headers={"X-Ratelimit-Retry": str(self.faults.retry_after)},
+            )
+        return await handler(request)
+
+    async def cards_list(self, request: web.Request) -> web.Response:
+        settings = json.loads(await request.text()).get("settings", {})
+        cursor = settings.get("cursor", {})
+        limit = min(cursor.get("limit", 100), 1000)
+        start = 0
+        if cursor.get("nmID"):
+            start = self.positions.get(cursor["nmID"], len(self.cards)) + 1
+        cards = self.cards[start : start + limit]
+        next_cursor = {"total": len(cards)}
+        if cards:
+            next_cursor["nmID"] = cards[-1]["nmID"]
+            next_cursor["updatedAt"] = cards[-1]["updatedAt"]
+        return web.json_response({"cards": cards, "cursor": next_cursor})
+
+    async def supplier_stocks(self, request: web.Request) -> web.Response:
+        try:
+            date_from = parse_date(request.query["dateFrom"])
+        except (KeyError, ValueError):
+            return web.json_response(
+                {"errors": ["invalid dateFrom"]}, status=400
+            )
+        stocks = [
+            stock
+            for stock, changed_at in zip(self.stocks, self.stocks_dates)
+            if changed_at >= date_from
+        ]
+        return web.json_response(stocks)
+
+    async def offices(self, request: web.Request) -> web.Response:
+        return web.json_response(
+            [
+                {"id": index, "name": name, "city": "Москва"}
+                for index, name in enumerate(self.warehouses)
+            ]
+        )
+
+
+def add_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--skus", type=int, default=1000)
+    parser.add_argument("--warehouses", type=int, default=150)
+    parser.add_argument("--warehouses-per-card", type=int, default=5)
+    parser.add_argument("--card-padding", type=int, default=0)
+    parser.add_argument("--latency", type=float, default=0)
+    parser.add_argument("--latency-jitter", type=float, default=0)
+    parser.add_argument("--rate-limit-share", type=float, default=0)
+    parser.add_argument("--retry-after", type=float, default=1)
+
+
+def from_arguments(args: argparse.Namespace) -> FakeWildberries:
+    return FakeWildberries(
+        args.skus,
+        args.warehouses,
+        args.warehouses_per_card,
+        args.card_padding,
+        FaultsConfig(
+            latency=args.latency,
+            latency_jitter=args.latency_jitter,
+            rate_limit_share=args.rate_limit_share,
+            retry_after=args.retry_after,
+        ),
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    add_arguments(parser)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    fake_wildberries = from_arguments(args)
+    logger.info(
+        f"{len(fake_wildberries.cards)} cards, "
+        f"{len(fake_wildberries.stocks)} stock rows"
+    )
+    web.run_app(fake_wildberries.create_app(), port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+"""
+Нагрузочный тест: расчет изменений тарифов для N продавцов одновременно,
+как при рассылке в слот. Каждый продавец получает свой токен, поэтому
+лимиты WBParser действуют так же, как в боте.
+
+По умолчанию в том же процессе поднимается benchmarks.fake_wb с
+параметрами из командной строки, либо используется уже запущенный сервер:
+
+    python -m benchmarks.load --sellers 200 --concurrency 10 --latency 0.3
+    python -m benchmarks.load --sellers 200 --base-url http://localhost:8081
+
+Тарифы генерируются для складов из /api/v3/offices. Бд берется из тех же
+переменных окружения, что и у бота, с накатанными миграциями.
+"""
+import argparse
+import asyncio
+import datetime
+import statistics
+import time
+
+from aiohttp import web
+
+from benchmarks import fake_wb
+from benchmarks.pipeline import create_seller, delete_seller
+from benchmarks.results import save_result
+from benchmarks.synthetic import StaticTariffsStore, make_tariffs
+from config_data.config import WildberriesAPIConfig, load_config
+from database import Database
+from http_client import HTTPClient
+from logistics_info_processor import LogisticsInfoProcessor
+from wb_data_extractor import WBDataExtractor
+from wb_parser import WBParser
+
+SELLERS = 100
+CONCURRENCY = 10
+
+
+async def get_warehouses(
+    http_client: HTTPClient, api_config: WildberriesAPIConfig
+) -> list[str]:
+    async with http_client.session.get(
+        f"{api_config.suppliers_url}/api/v3/offices",
+        headers={"Authorization": "load"},
+    ) as response:
+        return [office["name"] for office in await response.json()]
+
+
+async def run_seller(
+    semaphore: asyncio.Semaphore,
+    db: Database,
+    http_client: HTTPClient,
+    api_config: WildberriesAPIConfig,
+    tariffs_store: StaticTariffsStore,
+    seller_id: int,
+) -> float:
+    """
+    Расчет для одного продавца как в build_info. Возвращает время
+    выполнения без ожидания в очереди
+    """
+    async with semaphore:
+        start = time.perf_counter()
+        wb_parser = WBParser(
+            f"load-{seller_id}", http_client.session, api_config
+        )
+        extractor = WBDataExtractor(wb_parser, db, seller_id)
+        processor = LogisticsInfoProcessor(
+            tariffs_store, db, extractor, seller_id
+        )
+        await extractor.insert_products()
+        await processor.return_info()
+        return time.perf_counter() - start
+
+
+def percentile(quantiles: list[float], value: int) -> float:
+    return round(quantiles[value - 1], 3)
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sellers", type=int, default=SELLERS)
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCY)
+    parser.add_argument("--base-url")
+    parser.add_argument("--port", type=int, default=fake_wb.DEFAULT_PORT)
+    parser.add_argument("--no-save", action="store_true")
+    fake_wb.add_arguments(parser)
+    args = parser.parse_args()
+
+    runner = None
+    base_url = args.base_url
+    if base_url is None:
+        runner = web.AppRunner(fake_wb.from_arguments(args).create_app())
+        await runner.setup()
+        await web.TCPSite(runner, "localhost", args.port).start()
+        base_url = f"http://localhost:{args.port}"
+    api_config = WildberriesAPIConfig(
+        suppliers_url=base_url, statistics_url=base_url
+    )
+
+    config = load_config(path=None)
+    db = Database(
+        name=config.db.postgres_db,
+        user=config.db.postgres_user,
+        password=config.db.postgres_password,
+        host=config.db.db_host,
+        port=config.db.db_port,
+    )
+    await db.create_pool()
+    http_client = HTTPClient()
+    await http_client.start()
+    sellers_ids = []
+    try:
+        today = datetime.date.today()
+        todays, tomorrows = make_tariffs(
+            await get_warehouses(http_client, api_config), today
+        )
+        tariffs_store = StaticTariffsStore(
+            {today: todays, today + datetime.timedelta(days=1): tomorrows}
+        )
+        for _ in range(args.sellers):
+            sellers_ids.append(await create_seller(db))
+
+        semaphore = asyncio.Semaphore(args.concurrency)
+        start = time.perf_counter()
+        results = await asyncio.gather(
+            *(
+                run_seller(
+                    semaphore,
+                    db,
+                    http_client,
+                    api_config,
+                    tariffs_store,
+                    seller_id,
+                )
+                for seller_id in sellers_ids
+            ),
+            return_exceptions=True,
+        )
+        elapsed = time.perf_counter() - start
+    finally:
+        for seller_id in sellers_ids:
+            await delete_seller(db, seller_id)
+        await http_client.close()
+        await db.pool.close()
+        if runner is not None:
+            await runner.cleanup()
+
+    latencies = [result for result in results if isinstance(result, float)]
+    errors = [result for result in results if isinstance(result, Exception)]
+    for error in errors[:5]:
+        print(f"error: {error!r}")
+    throughput = len(latencies) / elapsed
+    timings = {"elapsed": round(elapsed, 3)}
+    if len(latencies) > 1:
+        quantiles = statistics.quantiles(latencies, n=100)
+        timings.update(
+            p50=percentile(quantiles, 50),
+            p95=percentile(quantiles, 95),
+            p99=percentile(quantiles, 99),
+        )
+    print(
+        f"{args.sellers} sellers, concurrency {args.concurrency}: "
+        f"{throughput:.2f} sellers/s, {len(errors)} errors"
+    )
+    for name, seconds in timings.items():
+        print(f"  {name}: {seconds}s")
+    if not args.no_save:
+        save_result(
+            "load",
+            {
+                "sellers": args.sellers,
+                "concurrency": args.concurrency,
+                "external_server": args.base_url is not None,
+                "skus": args.skus,
+                "warehouses": args.warehouses,
+                "card_padding": args.card_padding,
+                "latency": args.latency,
+                "rate_limit_share": args.rate_limit_share,
+            },
+            timings,
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,244 @@
+"""
+Бенчмарк конвейера обработки продавца на синтетических данных против
+локального Postgres с накатанными миграциями (alembic upgrade head).
+
+Для каждого размера продавца замеряются этапы по отдельности и весь
+расчет целиком: первый запуск для нового продавца и ежедневный запуск с
+уже загруженными данными. Медианы по прогонам дописываются в
+benchmarks/results.jsonl, сравнение: python -m benchmarks.results
+
+    python -m benchmarks.pipeline [--skus 10000 --warehouses 150] [--runs 3]
+
+Подключение к бд берется из тех же переменных окружения, что и у бота.
+"""
+import argparse
+import asyncio
+import contextlib
+import datetime
+import random
+import statistics
+import time
+
+from benchmarks.results import RESULTS_PATH, save_result
+from benchmarks.synthetic import (
+    StaticTariffsStore,
+    SyntheticWBParser,
+    change_stocks,
+    make_cards,
+    make_stocks,
+    make_tariffs,
+    make_warehouses,
+)
+from config_data.config import load_config
+from database import Database
+from logistics_info_processor import LogisticsInfoProcessor
+from wb_data_extractor import WBDataExtractor
+
+SIZES = [(1_000, 50), (10_000, 150), (100_000, 300)]
+WAREHOUSES_PER_CARD = 5
+CHANGED_STOCKS_SHARE = 0.05
+RUNS = 3
+
+
+@contextlib.contextmanager
+def stage(timings: dict[str, float], name: str):
+    start = time.perf_counter()
+    yield
+    timings[name] = time.perf_counter() - start
+
+
+async def create_seller(db: Database) -> int:
+    now = datetime.datetime.now()
+    user_id = await db.pool.fetchval(
+        "INSERT INTO users (user_tg_id, username, added_at) "
+        "VALUES ($1, 'benchmark', $2) RETURNING id",
+        -random.randrange(1, 2**31),
+        now,
+    )
+    return await db.pool.fetchval(
+        "INSERT INTO sellers (user_id, api_token, added_at) "
+        "VALUES ($1, 'benchmark', $2) RETURNING id",
+        user_id,
+        now,
+    )
+
+
+async def delete_seller(db: Database, seller_id: int):
+    async with db.pool.acquire() as connection:
+        async with connection.transaction():
+            for table in (
+                "warehouse_stock_index",
+                "current_stocks",
+                "stocks",
+                "prepared_notifications",
+                "products",
+            ):
+                await connection.execute(
+                    f"DELETE FROM {table} WHERE seller_id = $1", seller_id
+                )
+            user_id = await connection.fetchval(
+                "DELETE FROM sellers WHERE id = $1 RETURNING user_id",
+                seller_id,
+            )
+            await connection.execute(
+                "DELETE FROM users WHERE id = $1", user_id
+            )
+
+
+def make_seller_data(skus: int, warehouses_count: int, seed: int):
+    today = datetime.date.today()
+    warehouses = make_warehouses(warehouses_count)
+    cards = make_cards(skus, seed=seed)
+    stocks = make_stocks(cards, warehouses, WAREHOUSES_PER_CARD, seed=seed)
+    todays, tomorrows = make_tariffs(warehouses, today, seed=seed)
+    tariffs_store = StaticTariffsStore(
+        {today: todays, today + datetime.timedelta(days=1): tomorrows}
+    )
+    return SyntheticWBParser(cards, stocks), tariffs_store
+
+
+async def run_stages(
+    db: Database, skus: int, warehouses_count: int, seed: int
+) -> dict[str, float]:
+    """
+    Замер этапов конвейера по отдельности
+    """
+    wb_parser, tariffs_store = make_seller_data(skus, warehouses_count, seed)
+    seller_id = await create_seller(db)
+    timings = {}
+    try:
+        extractor = WBDataExtractor(wb_parser, db, seller_id)
+        processor = LogisticsInfoProcessor(
+            tariffs_store, db, extractor, seller_id
+        )
+        with stage(timings, "products_full"):
+            await extractor.insert_products()
+        with stage(timings, "products_incremental"):
+            await extractor.insert_products()
+        with stage(timings, "stocks_full"):
+            await extractor.extract_warehouses_stocks()
+        # Повторная полная загрузка тех же остатков сразу после первой,
+        # без ANALYZE, как при пересинхронизации нового продавца
+        await db.pool.execute(
+            "UPDATE sellers SET stocks_synced_at = NULL WHERE id = $1",
+            seller_id,
+        )
+        with stage(timings, "stocks_resync"):
+            await extractor.extract_warehouses_stocks()
+        change_stocks(
+            wb_parser.stocks,
+            CHANGED_STOCKS_SHARE,
+            datetime.datetime.now(),
+            seed=seed,
+        )
+        with stage(timings, "stocks_incremental"):
+            await extractor.extract_warehouses_stocks()
+        with stage(timings, "relevant_products"):
+            relevant_products = await processor.get_relevant_products()
+        todays_tariffs = await processor.get_tariffs()
+        tomorrows_tariffs = await processor.get_tariffs(
+            datetime.date.today() + datetime.timedelta(days=1)
+        )
+        with stage(timings, "calculate_costs"):
+            costs = processor.calculate_costs(
+                relevant_products, todays_tariffs, tomorrows_tariffs
+            )
+        with stage(timings, "render_message"):
+            processor.render_message(relevant_products, costs)
+    finally:
+        await delete_seller(db, seller_id)
+    return timings
+
+
+async def run_end_to_end(
+    db: Database, skus: int, warehouses_count: int, seed: int
+) -> dict[str, float]:
+    """
+    Замер полного расчета как в build_info: для нового продавца и
+    повторно, когда изменилась часть остатков
+    """
+    wb_parser, tariffs_store = make_seller_data(skus, warehouses_count, seed)
+    seller_id = await create_seller(db)
+    timings = {}
+    try:
+        for name in ("end_to_end_first", "end_to_end_daily"):
+            if name == "end_to_end_daily":
+                change_stocks(
+                    wb_parser.stocks,
+                    CHANGED_STOCKS_SHARE,
+                    datetime.datetime.now(),
+                    seed=seed,
+                )
+            extractor = WBDataExtractor(wb_parser, db, seller_id)
+            processor = LogisticsInfoProcessor(
+                tariffs_store, db, extractor, seller_id
+            )
+            with stage(timings, name):
+                await extractor.insert_products()
+                await processor.return_info()
+    finally:
+        await delete_seller(db, seller_id)
+    return timings
+
+
+async def run(
+    db: Database, skus: int, warehouses_count: int, runs: int
+) -> dict[str, float]:
+    samples: dict[str, list[float]] = {}
+    for seed in range(runs):
+        for timings in (
+            await run_stages(db, skus, warehouses_count, seed),
+            await run_end_to_end(db, skus, warehouses_count, seed),
+        ):
+            for name, seconds in timings.items():
+                samples.setdefault(name, []).append(seconds)
+    return {
+        name: round(statistics.median(values), 4)
+        for name, values in samples.items()
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--skus", type=int)
+    parser.add_argument("--warehouses", type=int, default=150)
+    parser.add_argument("--runs", type=int, default=RUNS)
+    parser.add_argument("--no-save", action="store_true")
+    args = parser.parse_args()
+    sizes = SIZES if args.skus is None else [(args.skus, args.warehouses)]
+
+    config = load_config(path=None)
+    db = Database(
+        name=config.db.postgres_db,
+        user=config.db.postgres_user,
+        password=config.db.postgres_password,
+        host=config.db.db_host,
+        port=config.db.db_port,
+    )
+    await db.create_pool()
+    try:
+        for skus, warehouses_count in sizes:
+            timings = await run(db, skus, warehouses_count, args.runs)
+            print(f"{skus} SKUs, {warehouses_count} warehouses:")
+            for name, seconds in timings.items():
+                print(f"  {name:<24} {seconds:>9.3f}s")
+            if not args.no_save:
+                save_result(
+                    "pipeline",
+                    {
+                        "skus": skus,
+                        "warehouses": warehouses_count,
+                        "warehouses_per_card": WAREHOUSES_PER_CARD,
+                        "changed_stocks_share": CHANGED_STOCKS_SHARE,
+                        "runs": args.runs,
+                    },
+                    timings,
+                )
+        if not args.no_save:
+            print(f"Results saved to {RESULTS_PATH}")
+    finally:
+        await db.pool.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
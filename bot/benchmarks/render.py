@@ -0,0 +1,136 @@
+"""
+Бенчмарк сборки сообщения об изменении тарифов.
+
+Сравнивает потоковую сборку кусков через message_renderer с прежней
+конкатенацией через += и последующей разбивкой split_message: время и
+пиковый объем памяти.
+
+    python -m benchmarks.render
+"""
+import random
+import time
+import tracemalloc
+
+from logistics_info_processor import CHANGES_HEADER, LogisticsInfoProcessor
+from records import RelevantProduct
+
+SIZES = [(100, 3), (1_000, 5), (5_000, 8), (20_000, 10)]
+
+
+def make_data(products_count: int, warehouses_per_product: int):
+    warehouses = [f"Склад {i}" for i in range(150)]
+    relevant_products = {}
+    costs = {}
+    for i in range(products_count):
+        nm_id = 10_000_000 + i
+        product_warehouses = random.sample(warehouses, warehouses_per_product)
+        relevant_products[nm_id] = RelevantProduct(
+            nm_id,
+            f"VC-{i}",
+            f"Товар номер {i} с достаточно длинным названием",
+            20,
+            15,
+            10,
+            product_warehouses,
+        )
+        for warehouse in product_warehouses:
+            costs[(nm_id, warehouse)] = (
+                round(random.uniform(30, 90), 2),
+                round(random.uniform(30, 90), 2),
+            )
+    return relevant_products, costs
+
+
+def split_message(message, max_length=4096):
+    if len(message) <= max_length:
+        return [message]
+
+    title_break = message.find("\n\n")
+    if title_break != -1:
+        title = message[: title_break + 2]
+        message_body = message[title_break + 2 :]
+    else:
+        title = ""
+        message_body = message
+
+    lines = message_body.split("\n")
+    chunks = []
+    current_chunk = title
+
+    for line in lines:
+        if len(current_chunk) + len(line) + 1 > max_length:
+            chunks.append(current_chunk)
+            current_chunk = line
+        else:
+            if current_chunk != title:
+                current_chunk += "\n"
+            current_chunk += line
+    if current_chunk:
+        chunks.append(current_chunk)
+
+    return chunks
+
+
+def legacy_render(relevant_products, costs):
+    message = CHANGES_HEADER
+    for index, product in enumerate(relevant_products):
+        nm_id = product
+        product = relevant_products.get(nm_id)
+        product_title = product.title
+        vendor_code = product.vendor_code
+
+        url = f"https://www.wildberries.ru/catalog/{nm_id}/detail.aspx"
+        message += f"{index + 1}. [{product_title} ({vendor_code})]({url})\n"
+
+        for warehouse in product.warehouses:
+            logistics_cost = costs.get((nm_id, warehouse))
+            if logistics_cost is None:
+                continue
+            current_logistics, next_logistics = logistics_cost
+            if current_logistics < next_logistics:
+                message += "- 🔴 "
+            else:
+                message += "- 🟢 "
+            message += (
+                f"{warehouse}: {current_logistics}₽ -> {next_logistics}₽\n"
+            )
+        message += "\n"
+    return split_message(message)
+
+
+def measure(func, *args):
+    tracemalloc.start()
+    start = time.perf_counter()
+    chunks = func(*args)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return chunks, elapsed, peak / 2**20
+
+
+def main():
+    processor = LogisticsInfoProcessor(None, None, None, seller_id=1)
+    print(
+        f"{'products':>9} {'chunks':>7} {'stream, s':>10} {'MiB':>6} "
+        f"{'legacy, s':>10} {'MiB':>6}"
+    )
+    for products_count, warehouses_per_product in SIZES:
+        relevant_products, costs = make_data(
+            products_count, warehouses_per_product
+        )
+        chunks, streamed, streamed_peak = measure(
+            processor.render_message, relevant_products, costs
+        )
+
+        _, legacy, legacy_peak = measure(
+            legacy_render, relevant_products, costs
+        )
+
+        print(
+            f"{products_count:>9} {len(chunks):>7} {streamed:>10.3f} "
+            f"{streamed_peak:>6.1f} {legacy:>10.3f} {legacy_peak:>6.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
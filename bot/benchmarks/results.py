@@ -0,0 +1,134 @@
+"""
+Хранение результатов бенчмарков в формате JSON lines и сравнение
+последнего прогона с предыдущим или с прогоном указанной ревизии.
+
+    python -m benchmarks.results [--baseline <ревизия>] [--threshold 0.1]
+
+Путь к файлу результатов можно переопределить переменной окружения
+BENCHMARK_RESULTS.
+"""
+import argparse
+import datetime
+import json
+import os
+import pathlib
+import platform
+import subprocess
+
+RESULTS_PATH = pathlib.Path(
+    os.environ.get(
+        "BENCHMARK_RESULTS", pathlib.Path(__file__).parent / "results.jsonl"
+    )
+)
+REGRESSION_THRESHOLD = 0.1
+
+
+def git_revision() -> str | None:
+    try:
+        revision = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+        dirty = subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return f"{revision}-dirty" if dirty else revision
+
+
+def save_result(
+    benchmark: str,
+    params: dict,
+    timings: dict[str, float],
+    path: pathlib.Path = RESULTS_PATH,
+):
+    """
+    Добавление результата прогона в файл результатов
+    """
+    result = {
+        "benchmark": benchmark,
+        "revision": git_revision(),
+        "created_at": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "params": params,
+        "timings": timings,
+    }
+    with open(path, "a", encoding="utf-8") as file:
+        file.write(json.dumps(result, ensure_ascii=False) + "\n")
+
+
+def load_results(path: pathlib.Path = RESULTS_PATH) -> list[dict]:
+    if not path.exists():
+        return []
+    with open(path, encoding="utf-8") as file:
+        return [json.loads(line) for line in file if line.strip()]
+
+
+def result_key(result: dict) -> str:
+    params = json.dumps(result["params"], sort_keys=True)
+    return f"{result['benchmark']} {params}"
+
+
+def compare(
+    results: list[dict],
+    baseline: str | None = None,
+    threshold: float = REGRESSION_THRESHOLD,
+) -> int:
+    """
+    Печать изменения времени по этапам для каждого набора параметров.
+    Возвращает количество этапов, замедлившихся больше чем на threshold
+    """
+    runs: dict[str, list[dict]] = {}
+    for result in results:
+        runs.setdefault(result_key(result), []).append(result)
+    regressions = 0
+    for key, key_runs in runs.items():
+        current = key_runs[-1]
+        previous = [
+            result
+            for result in key_runs[:-1]
+            if baseline is None or result["revision"] == baseline
+        ]
+        if not previous:
+            continue
+        reference = previous[-1]
+        print(f"{key}\n  {reference['revision']} -> {current['revision']}")
+        for stage, seconds in current["timings"].items():
+            before = reference["timings"].get(stage)
+            if not before:
+                print(f"  {stage:<24} {seconds:>9.3f}s")
+                continue
+            change = seconds / before - 1
+            mark = ""
+            if change > threshold:
+                mark = "  REGRESSION"
+                regressions += 1
+            print(
+                f"  {stage:<24} {before:>9.3f}s {seconds:>9.3f}s "
+                f"{change:>+7.1%}{mark}"
+            )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--baseline")
+    parser.add_argument(
+        "--threshold", type=float, default=REGRESSION_THRESHOLD
+    )
+    parser.add_argument("--path", type=pathlib.Path, default=RESULTS_PATH)
+    args = parser.parse_args()
+    regressions = compare(
+        load_results(args.path), args.baseline, args.threshold
+    )
+    raise SystemExit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Бенчмарк сопоставления остатков с товарами в WBDataExtractor.
+
+Сравнивает сопоставление по индексу nm_id -> product_id в
+iter_stock_batches с прежним линейным поиском и показывает, что время на
+одну строку остатков не растет с размером каталога.
+
+    python -m benchmarks.stock_join
+"""
+import asyncio
+import random
+import time
+
+from wb_data_extractor import StocksStats, WBDataExtractor
+
+SIZES = [(1_000, 7_500), (5_000, 37_500), (20_000, 150_000)]
+LEGACY_MAX_PRODUCTS = 5_000
+
+
+def make_data(products_count: int, stocks_count: int):
+    products = [
+        {"id": i + 1, "nm_id": 10_000_000 + i} for i in range(products_count)
+    ]
+    stocks = [
+        {
+            "nmId": 10_000_000 + random.randrange(int(products_count * 1.05)),
+            "lastChangeDate": "2024-01-25T19:02:13",
+            "warehouseName": f"Склад {random.randrange(150)}",
+            "quantity": random.randrange(100),
+        }
+        for _ in range(stocks_count)
+    ]
+    return products, stocks
+
+
+def legacy_join(products, stocks):
+    matched = 0
+    for stock in stocks:
+        product_id = next(
+            (
+                row.get("id")
+                for row in products
+                if stock.get("nmId") == row.get("nm_id")
+            ),
+            None,
+        )
+        if product_id:
+            matched += 1
+    return matched
+
+
+async def iter_stocks(stocks: list[dict]):
+    for stock in stocks:
+        yield stock
+
+
+async def join(
+    extractor: WBDataExtractor,
+    stocks: list[dict],
+    products_index: dict[int, int],
+) -> StocksStats:
+    stats = StocksStats()
+    async for _ in extractor.iter_stock_batches(
+        iter_stocks(stocks), products_index, stats
+    ):
+        pass
+    return stats
+
+
+async def main():
+    extractor = WBDataExtractor(wb_parser=None, db=None, seller_id=1)
+    print(
+        f"{'products':>9} {'stocks':>8} {'index, s':>9} "
+        f"{'us/row':>7} {'unmatched':>9} {'legacy, s':>10}"
+    )
+    for products_count, stocks_count in SIZES:
+        products, stocks = make_data(products_count, stocks_count)
+
+        start = time.perf_counter()
+        products_index = {row["nm_id"]: row["id"] for row in products}
+        unmatched = (await join(extractor, stocks, products_index)).unmatched
+        indexed = time.perf_counter() - start
+
+        legacy = "-"
+        if products_count <= LEGACY_MAX_PRODUCTS:
+            start = time.perf_counter()
+            legacy_join(products, stocks)
+            legacy = f"{time.perf_counter() - start:.2f}"
+
+        print(
+            f"{products_count:>9} {stocks_count:>8} {indexed:>9.3f} "
+            f"{indexed / stocks_count * 1e6:>7.2f} {unmatched:>9} {legacy:>10}"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,165 @@
+"""
+Бенчмарк памяти при загрузке остатков.
+
+Сравнивает пиковый объем памяти прежней загрузки (весь ответ через
+response.json() и список строк stocks) с потоковым разбором
+WBParser.open_warehouses_stocks и пачками WBDataExtractor.iter_stock_batches.
+Ответ отдается локальным сервером из файла, поэтому в замер попадает
+только клиентская сторона. Пик потоковой загрузки не должен расти с
+размером ответа.
+
+    python -m benchmarks.stocks_memory
+"""
+import asyncio
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+
+import aiohttp
+from aiohttp import web
+
+from benchmarks.results import save_result
+from benchmarks.synthetic import make_cards, make_stocks, make_warehouses
+from config_data.config import WildberriesAPIConfig
+from records import StockRow
+from wb_data_extractor import StocksStats, WBDataExtractor
+from wb_parser import WBParser
+
+CARDS = [1_000, 5_000, 20_000]
+WAREHOUSES = 150
+PORT = 8082
+
+
+def make_response(cards_count: int) -> tuple[str, dict[int, int], int]:
+    """
+    Файл с ответом /api/v1/supplier/stocks и индекс nm_id -> product_id
+    """
+    cards = make_cards(cards_count)
+    stocks = make_stocks(cards, make_warehouses(WAREHOUSES))
+    products_index = {
+        card["nmID"]: index + 1 for index, card in enumerate(cards)
+    }
+    file, path = tempfile.mkstemp(suffix=".json")
+    with os.fdopen(file, "w", encoding="utf-8") as response_file:
+        json.dump(stocks, response_file, ensure_ascii=False)
+    return path, products_index, len(stocks)
+
+
+async def measure(coroutine) -> tuple[float, float]:
+    tracemalloc.reset_peak()
+    baseline, _ = tracemalloc.get_traced_memory()
+    start = time.perf_counter()
+    await coroutine
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    return elapsed, (peak - baseline) / 2**20
+
+
+def join_stocks(
+    extractor: WBDataExtractor,
+    stocks_data: list[dict],
+    products_index: dict[int, int],
+) -> list[StockRow]:
+    """
+    Прежнее сопоставление всего ответа списком, до потоковой загрузки
+    """
+    stocks_list = []
+    for stock in stocks_data:
+        product_id = products_index.get(stock.get("nmId"))
+        if product_id:
+            stocks_list.append(extractor.stock_row(stock, product_id))
+    return stocks_list
+
+
+async def legacy_load(
+    session: aiohttp.ClientSession,
+    url: str,
+    extractor: WBDataExtractor,
+    products_index: dict[int, int],
+):
+    async with session.get(url) as response:
+        stocks_data = await response.json()
+    return len(join_stocks(extractor, stocks_data, products_index))
+
+
+async def streaming_load(
+    wb_parser: WBParser,
+    extractor: WBDataExtractor,
+    products_index: dict[int, int],
+):
+    rows = 0
+    async with wb_parser.open_warehouses_stocks() as stocks:
+        async for batch in extractor.iter_stock_batches(
+            stocks, products_index, StocksStats()
+        ):
+            rows += len(batch)
+    return rows
+
+
+async def main():
+    responses = {}
+    app = web.Application()
+
+    async def supplier_stocks(request: web.Request) -> web.FileResponse:
+        return web.FileResponse(responses[request.match_info["size"]])
+
+    app.router.add_get("/{size}/api/v1/supplier/stocks", supplier_stocks)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, "localhost", PORT).start()
+
+    tracemalloc.start()
+    print(
+        f"{'rows':>8} {'body, MiB':>10} {'legacy, s':>10} {'MiB':>7} "
+        f"{'stream, s':>10} {'MiB':>7}"
+    )
+    try:
+        async with aiohttp.ClientSession() as session:
+            for cards_count in CARDS:
+                path, products_index, rows = make_response(cards_count)
+                size = str(cards_count)
+                responses[size] = path
+                base_url = f"http://localhost:{PORT}/{size}"
+                extractor = WBDataExtractor(None, None, seller_id=1)
+                wb_parser = WBParser(
+                    f"stocks-memory-{size}",
+                    session,
+                    WildberriesAPIConfig(statistics_url=base_url),
+                )
+                try:
+                    legacy, legacy_peak = await measure(
+                        legacy_load(
+                            session,
+                            f"{base_url}/api/v1/supplier/stocks",
+                            extractor,
+                            products_index,
+                        )
+                    )
+                    streamed, streamed_peak = await measure(
+                        streaming_load(wb_parser, extractor, products_index)
+                    )
+                    body_size = os.path.getsize(path) / 2**20
+                finally:
+                    os.remove(path)
+                print(
+                    f"{rows:>8} {body_size:>10.1f} {legacy:>10.2f} "
+                    f"{legacy_peak:>7.1f} {streamed:>10.2f} "
+                    f"{streamed_peak:>7.1f}"
+                )
+                save_result(
+                    "stocks_memory",
+                    {"cards": cards_count, "warehouses": WAREHOUSES},
+                    {
+                        "streamed": round(streamed, 4),
+                        "streamed_peak_mib": round(streamed_peak, 2),
+                    },
+                )
+    finally:
+        tracemalloc.stop()
+        await runner.cleanup()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
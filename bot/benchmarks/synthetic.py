@@ -0,0 +1,268 @@
+"""
+Генераторы синтетических данных продавца в формате API Wildberries и бд
+тарифов: каталог карточек, остатки по складам и тарифы складов.
+"""
+import datetime
+import random
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator
+
+from timestamps import wb_timestamps
+
+from tariffs_store import TariffsSnapshot
+
+CARDS_PAGE_SIZE = 1000
+SIZES = ["XS", "S", "M", "L", "XL"]
+STOCKS_HISTORY_DAYS = 30
+
+
+def make_warehouses(count: int) -> list[str]:
+    return [f"Склад {index}" for index in range(count)]
+
+
+def make_cards(
+    count: int,
+    updated_at: datetime.datetime | None = None,
+    seed: int = 0,
+) -> list[dict]:
+    """
+    Карточки товаров, как их возвращает /content/v2/get/cards/list: от
+    последних измененных к более ранним
+    """
+    rng = random.Random(seed)
+    updated_at = updated_at or datetime.datetime(2024, 1, 25, 19, 0)
+    cards = []
+    for index in range(count):
+        nm_id = 10_000_000 + index
+        changed_at = (
+            updated_at - datetime.timedelta(minutes=index)
+        ).strftime("%Y-%m-%dT%H:%M:%SZ")
+        sizes_count = rng.randint(1, len(SIZES))
+        cards.append(
+            {
+                "nmID": nm_id,
+                "imtID": 20_000_000 + index,
+                "nmUUID": f"01{nm_id:030d}",
+                "subjectID": rng.randrange(5000),
+                "subjectName": "Футболки",
+                "vendorCode": f"VC-{index}",
+                "brand": f"Бренд {rng.randrange(100)}",
+                "title": f"Товар {index} с достаточно длинным названием",
+                "description": "Описание товара " * rng.randint(5, 40),
+                "video": "",
+                "photos": [
+                    {
+                        "big": f"https://basket.wb.ru/{nm_id}/{photo}.jpg",
+                        "small": f"https://basket.wb.ru/{nm_id}/{photo}s.jpg",
+                    }
+                    for photo in range(rng.randint(1, 8))
+                ],
+                "dimensions": {
+                    "length": rng.randint(5, 60),
+                    "width": rng.randint(5, 40),
+                    "height": rng.randint(1, 30),
+                },
+                "characteristics": [
+                    {
+                        "id": field,
+                        "name": f"Характеристика {field}",
+                        "value": [f"Значение {rng.randrange(50)}"],
+                    }
+                    for field in range(rng.randint(3, 15))
+                ],
+                "sizes": [
+                    {
+                        "chrtID": nm_id * 10 + size_index,
+                        "techSize": SIZES[size_index],
+                        "skus": [f"{nm_id}{size_index:02d}"],
+                    }
+                    for size_index in range(sizes_count)
+                ],
+                "tags": [],
+                "createdAt": "2023-01-01T00:00:00Z",
+                "updatedAt": changed_at,
+            }
+        )
+    return cards
+
+
+def make_stocks(
+    cards: list[dict],
+    warehouses: list[str],
+    warehouses_per_card: int = 5,
+    last_change_date: datetime.datetime | None = None,
+    seed: int = 0,
+) -> list[dict]:
+    """
+    Остатки, как их возвращает /api/v1/supplier/stocks: строка на каждый
+    размер товара на каждом складе. Даты изменения распределены по
+    STOCKS_HISTORY_DAYS дням до last_change_date, поэтому отметка
+    синхронизации после загрузки отсекает почти все строки
+    """
+    rng = random.Random(seed)
+    last_change_date = last_change_date or datetime.datetime(2024, 1, 25)
+    history = STOCKS_HISTORY_DAYS * 24 * 3600
+    warehouses_per_card = min(warehouses_per_card, len(warehouses))
+    stocks = []
+    for card in cards:
+        for warehouse in rng.sample(warehouses, warehouses_per_card):
+            for size in card["sizes"]:
+                quantity = rng.randrange(50)
+                changed_at = last_change_date - datetime.timedelta(
+                    seconds=rng.randrange(history)
+                )
+                stocks.append(
+                    {
+                        "lastChangeDate": changed_at.strftime(
+                            "%Y-%m-%dT%H:%M:%S"
+                        ),
+                        "warehouseName": warehouse,
+                        "supplierArticle": card["vendorCode"],
+                        "nmId": card["nmID"],
+                        "barcode": size["skus"][0],
+                        "quantity": quantity,
+                        "inWayToClient": rng.randrange(5),
+                        "inWayFromClient": rng.randrange(3),
+                        "quantityFull": quantity + 2,
+                        "category": "Одежда",
+                        "subject": card["subjectName"],
+                        "brand": card["brand"],
+                        "techSize": size["techSize"],
+                        "Price": rng.randint(500, 5000),
+                        "Discount": rng.randrange(70),
+                        "isSupply": True,
+                        "isRealization": False,
+                        "SCCode": "Tech",
+                    }
+                )
+    return stocks
+
+
+def change_stocks(
+    stocks: list[dict],
+    share: float,
+    last_change_date: datetime.datetime,
+    seed: int = 0,
+) -> list[dict]:
+    """
+    Изменение количества у доли остатков с новой датой изменения, как при
+    ежедневной синхронизации
+    """
+    rng = random.Random(seed)
+    changed_at = last_change_date.strftime("%Y-%m-%dT%H:%M:%S")
+    for stock in rng.sample(stocks, int(len(stocks) * share)):
+        stock["quantity"] = rng.randrange(50)
+        stock["quantityFull"] = stock["quantity"] + 2
+        stock["lastChangeDate"] = changed_at
+    return stocks
+
+
+def make_tariffs(
+    warehouses: list[str],
+    date: datetime.date,
+    changed_share: float = 0.3,
+    seed: int = 0,
+) -> tuple[list[dict], list[dict]]:
+    """
+    Строки wb_warehouses_tariffs на date и на следующий день. У доли
+    складов changed_share коэффициент на следующий день меняется
+    """
+    rng = random.Random(seed)
+    todays, tomorrows = [], []
+    for warehouse in warehouses:
+        base = round(rng.uniform(30, 50), 2)
+        liter = round(rng.uniform(5, 10), 2)
+        expr = rng.choice([100, 125, 150, 200, 250, 300])
+        next_expr = expr
+        if rng.random() < changed_share:
+            next_expr = expr + rng.choice([-25, 25, 50])
+        row = {
+            "warehouse_name": warehouse,
+            "box_delivery_base": base,
+            "box_delivery_liter": liter,
+            "box_delivery_and_storage_expr": expr,
+            "box_delivery_and_storage_diff_sign": 0,
+            "date": date,
+        }
+        todays.append(row)
+        tomorrows.append(
+            {
+                **row,
+                "box_delivery_and_storage_expr": next_expr,
+                "box_delivery_and_storage_diff_sign": (
+                    (next_expr > expr) - (next_expr < expr)
+                ),
+                "date": date + datetime.timedelta(days=1),
+            }
+        )
+    return todays, tomorrows
+
+
+def parse_date(value: str) -> datetime.datetime:
+    return datetime.datetime.fromisoformat(value.rstrip("Z"))
+
+
+class SyntheticWBParser:
+    """
+    Замена WBParser, отдающая синтетические данные из памяти с той же
+    семантикой постраничной и инкрементальной загрузки
+    """
+
+    def __init__(
+        self,
+        cards: list[dict],
+        stocks: list[dict],
+        page_size: int = CARDS_PAGE_SIZE,
+    ):
+        self.cards = cards
+        self.stocks = stocks
+        self._page_size = page_size
+
+    async def iter_products(
+        self, updated_since: datetime.datetime | None = None
+    ) -> AsyncIterator[tuple[list[Any], list[datetime.datetime | None]]]:
+        for start in range(0, len(self.cards), self._page_size):
+            page = self.cards[start : start + self._page_size]
+            updated_at = wb_timestamps.parse_column(
+                "updatedAt", (card["updatedAt"] for card in page)
+            )
+            if updated_since:
+                changed, changed_updated_at = [], []
+                for card, card_updated_at in zip(page, updated_at):
+                    if card_updated_at >= updated_since:
+                        changed.append(card)
+                        changed_updated_at.append(card_updated_at)
+                if changed:
+                    yield changed, changed_updated_at
+                if len(changed) < len(page):
+                    return
+            else:
+                yield page, updated_at
+
+    @asynccontextmanager
+    async def open_warehouses_stocks(
+        self, date: str = "2019-06-20"
+    ) -> AsyncIterator[AsyncIterator[dict[str, Any]]]:
+        yield self._iter_stocks(parse_date(date))
+
+    async def _iter_stocks(
+        self, date_from: datetime.datetime
+    ) -> AsyncIterator[dict[str, Any]]:
+        for stock in self.stocks:
+            if parse_date(stock["lastChangeDate"]) >= date_from:
+                yield stock
+
+
+class StaticTariffsStore:
+    """
+    Замена TariffsStore с заранее заданными тарифами по датам
+    """
+
+    def __init__(self, tariffs: dict[datetime.date, list[dict]]):
+        self._snapshots = {
+            date: TariffsSnapshot(rows, fingerprint=None)
+            for date, rows in tariffs.items()
+        }
+
+    async def get(self, date: datetime.date) -> TariffsSnapshot:
+        return self._snapshots.get(date) or TariffsSnapshot([], None)
@@ -0,0 +1,110 @@
+"""
+Бенчмарк разбора дат из ответов Wildberries.
+
+Сравнивает прежний перебор форматов через strptime (str_to_date) с
+TimestampParser: поштучный разбор с запомненным форматом поля и разбор
+целой колонки. Для каждого вида строк проверяется, что результаты
+совпадают.
+
+    python -m benchmarks.timestamps
+"""
+import datetime
+import logging
+import random
+import time
+
+from benchmarks.results import save_result
+from timestamps import TimestampParser
+
+VALUES = 200_000
+REPEATS = 5
+FORMATS = {
+    "seconds": "%Y-%m-%dT%H:%M:%S",
+    "seconds_z": "%Y-%m-%dT%H:%M:%SZ",
+    "fraction_z": "%Y-%m-%dT%H:%M:%S.%fZ",
+}
+
+
+def str_to_date(value: str) -> datetime.date:
+    """
+    Прежняя реализация из utils
+    """
+    if isinstance(value, str):
+        date_formats = [
+            "%Y-%m-%dT%H:%M:%S",
+            "%Y-%m-%dT%H:%M:%S.%fZ",
+            "%Y-%m-%dT%H:%M:%SZ",
+        ]
+        for date_format in date_formats:
+            try:
+                return datetime.datetime.strptime(value, date_format)
+            except ValueError:
+                continue
+        logging.error(f"Failed to convert '{value}' to date")
+    return None
+
+
+def make_values(date_format: str, count: int) -> list[str]:
+    start = datetime.datetime(2023, 1, 1)
+    values = []
+    for _ in range(count):
+        value = start + datetime.timedelta(
+            seconds=random.randrange(365 * 24 * 3600),
+            milliseconds=random.randrange(1000),
+        )
+        value = value.strftime(date_format)
+        if date_format.endswith(".%fZ"):
+            # WB отдает дробную часть разной длины
+            value = value[: random.randint(21, 26)] + "Z"
+        values.append(value)
+    return values
+
+
+def best_of(func, values: list[str]) -> float:
+    timings = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        func(values)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    print(
+        f"{'format':>12} {'legacy, s':>10} {'parse, s':>9} "
+        f"{'column, s':>10} {'speedup':>8}"
+    )
+    for name, date_format in FORMATS.items():
+        values = make_values(date_format, VALUES)
+        parser = TimestampParser()
+        expected = [str_to_date(value) for value in values]
+        assert [parser.parse(name, value) for value in values] == expected
+        assert parser.parse_column(name, values) == expected
+
+        legacy = best_of(
+            lambda values: [str_to_date(value) for value in values], values
+        )
+        parsed = best_of(
+            lambda values: [parser.parse(name, value) for value in values],
+            values,
+        )
+        column = best_of(
+            lambda values: parser.parse_column(name, values), values
+        )
+        print(
+            f"{name:>12} {legacy:>10.3f} {parsed:>9.3f} {column:>10.3f} "
+            f"{legacy / column:>7.1f}x"
+        )
+        save_result(
+            "timestamps",
+            {"format": name, "values": VALUES},
+            {
+                "legacy": round(legacy, 4),
+                "parse": round(parsed, 4),
+                "column": round(column, 4),
+            },
+        )
+
+
+if __name__ == "__main__":
+    main()
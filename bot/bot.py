@@ -3,9 +3,30 @@ import logging
 import sentry_sdk
 
 from aiogram import Dispatcher
+from apscheduler.triggers.cron import CronTrigger
 
-from handlers import handlers
-from loader import bot, dp, wb_tariffs_db, scheduler, db, sentry_url
+from handlers import admin_handlers, handlers
+from metrics import RuntimeCollector, start_metrics_server
+from notification_dispatcher import (
+    migrate_seller_jobs,
+    prepare_notifications,
+    schedule_slots,
+)
+from tariffs_listener import TariffsListener
+from loader import (
+    config,
+    bot,
+    dp,
+    wb_tariffs_db,
+    scheduler,
+    db,
+    sentry_url,
+    http_client,
+    outbox,
+    ephemeral_messages,
+    onboarding_queue,
+    tariffs_store,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -26,14 +47,47 @@ async def main():
     logger.info("Starting bot")
     await db.create_pool()
     await wb_tariffs_db.create_pool()
+    await http_client.start()
+    await outbox.start()
+    await ephemeral_messages.start()
+    await onboarding_queue.start()
+    metrics_runner = await start_metrics_server(
+        config.metrics,
+        RuntimeCollector(
+            {"db": db, "wb_tariffs_db": wb_tariffs_db},
+            outbox,
+            [onboarding_queue],
+        ),
+    )
 
     logger.info("Database is created")
+    dp.include_router(admin_handlers.router)
     dp.include_router(handlers.router)
 
     scheduler.start()
+    scheduler.add_job(
+        handlers.reconcile_products,
+        trigger=CronTrigger(hour=4, timezone=handlers.MOSCOW_TIMEZONE),
+        id="reconcile_products",
+        replace_existing=True,
+    )
+    await migrate_seller_jobs()
+    schedule_slots()
+    tariffs_listener = TariffsListener(
+        wb_tariffs_db, tariffs_store, prepare_notifications
+    )
+    await tariffs_listener.start()
 
-    await bot.delete_webhook(drop_pending_updates=True)
-    await dp.start_polling(bot, on_shutdown=shutdown)
+    try:
+        await bot.delete_webhook(drop_pending_updates=True)
+        await dp.start_polling(bot, on_shutdown=shutdown)
+    finally:
+        await tariffs_listener.stop()
+        await onboarding_queue.stop()
+        await ephemeral_messages.stop()
+        await outbox.stop()
+        await http_client.close()
+        await metrics_runner.cleanup()
 
 
 if __name__ == "__main__":
@@ -1,7 +1,13 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 
 from environs import Env
 
+WB_SUPPLIERS_API_URL = "https://suppliers-api.wildberries.ru"
+WB_STATISTICS_API_URL = "https://statistics-api.wildberries.ru"
+METRICS_HOST = "127.0.0.1"
+METRICS_PORT = 9100
+PROFILES_DIRECTORY = "profiles"
+
 
 @dataclass
 class DatabaseConfig:
@@ -15,6 +21,7 @@ class DatabaseConfig:
 @dataclass
 class TgBot:
     token: str
+    admin_ids: list[int] = field(default_factory=list)
 
 
 @dataclass
@@ -22,12 +29,35 @@ class Sentry:
     url: str
 
 
+@dataclass
+class WildberriesAPIConfig:
+    suppliers_url: str = WB_SUPPLIERS_API_URL
+    statistics_url: str = WB_STATISTICS_API_URL
+
+
+@dataclass
+class MetricsConfig:
+    host: str = METRICS_HOST
+    port: int = METRICS_PORT
+
+
+@dataclass
+class ProfilingConfig:
+    directory: str = PROFILES_DIRECTORY
+    sample_rate: float = 0
+    sellers: list[int] = field(default_factory=list)
+    slots: list[str] = field(default_factory=list)
+
+
 @dataclass
 class Config:
     tg_bot: TgBot
     db: DatabaseConfig
     wb_tariffs_db: DatabaseConfig
     sentry_url: Sentry
+    wb_api: WildberriesAPIConfig
+    metrics: MetricsConfig
+    profiling: ProfilingConfig
 
 
 def load_config(path: str | None) -> Config:
@@ -35,7 +65,10 @@ def load_config(path: str | None) -> Config:
     env.read_env(path)
 
     return Config(
-        tg_bot=TgBot(token=env("BOT_TOKEN")),
+        tg_bot=TgBot(
+            token=env("BOT_TOKEN"),
+            admin_ids=env.list("ADMIN_IDS", [], subcast=int),
+        ),
         db=DatabaseConfig(
             postgres_db=env("POSTGRES_DB_1"),
             db_host=env("DB_HOST_1"),
@@ -51,4 +84,20 @@ def load_config(path: str | None) -> Config:
             db_port=env.int("DB_PORT_2"),
         ),
         sentry_url=Sentry(url=env("SENTRY_URL")),
+        wb_api=WildberriesAPIConfig(
+            suppliers_url=env("WB_SUPPLIERS_API_URL", WB_SUPPLIERS_API_URL),
+            statistics_url=env(
+                "WB_STATISTICS_API_URL", WB_STATISTICS_API_URL
+            ),
+        ),
+        metrics=MetricsConfig(
+            host=env("METRICS_HOST", METRICS_HOST),
+            port=env.int("METRICS_PORT", METRICS_PORT),
+        ),
+        profiling=ProfilingConfig(
+            directory=env("PROFILES_DIRECTORY", PROFILES_DIRECTORY),
+            sample_rate=env.float("PROFILE_SAMPLE_RATE", 0),
+            sellers=env.list("PROFILE_SELLERS", [], subcast=int),
+            slots=env.list("PROFILE_SLOTS", []),
+        ),
     )
@@ -1,8 +1,17 @@
 # import aioredis
+from contextlib import asynccontextmanager
 from dataclasses import dataclass, field
+from typing import AsyncIterable, AsyncIterator
 
 import asyncpg
-from asyncpg import Pool
+from asyncpg import Connection, Pool
+
+from metrics import ROWS_WRITTEN, timed
+from profiling import record_postgres_query
+
+
+async def single_batch(data: list[dict]) -> AsyncIterator[list[dict]]:
+    yield data
 
 
 @dataclass
@@ -21,8 +30,49 @@ class Database:
             password=self.password,
             host=self.host,
             port=self.port,
+            init=self._init_connection,
         )
 
+    @staticmethod
+    async def _init_connection(connection: Connection):
+        connection.add_query_logger(record_postgres_query)
+
+    @asynccontextmanager
+    async def staging(
+        self,
+        table_name: str,
+        data: list[dict] | AsyncIterable[list[dict]],
+        keys: list[str] | None = None,
+    ) -> AsyncIterator[tuple[Connection, str, list[str]]]:
+        """
+        Загрузка данных через COPY во временную таблицу с колонками целевой
+        таблицы. Временная таблица удаляется по завершении транзакции.
+        Вместо списка можно передать асинхронный поток пачек с колонками
+        keys, тогда каждая пачка копируется по мере поступления. Строки
+        могут быть словарями или кортежами в порядке keys
+        """
+        if isinstance(data, list):
+            keys = keys or list(data[0].keys())
+            data = single_batch(data)
+        staging_table = f"{table_name}_staging"
+        async with self.pool.acquire() as connection:
+            async with connection.transaction():
+                await connection.execute(
+                    f"CREATE TEMP TABLE {staging_table} ON COMMIT DROP AS "
+                    f"SELECT {', '.join(keys)} FROM {table_name} WITH NO DATA"
+                )
+                async for batch in data:
+                    records = batch
+                    if batch and isinstance(batch[0], dict):
+                        records = (
+                            tuple(item[key] for key in keys) for item in batch
+                        )
+                    await connection.copy_records_to_table(
+                        staging_table, records=records, columns=keys
+                    )
+                yield connection, staging_table, keys
+
+    @timed("insert_data")
     async def insert_data(
         self,
         table_name,
@@ -31,38 +81,47 @@ class Database:
         conflict_target=None,
         update_fields=None,
     ):
+        """
+        Массовая вставка данных: COPY во временную таблицу и один
+        INSERT ... SELECT с ON CONFLICT DO NOTHING, либо DO UPDATE, если
+        указаны conflict_target и update_fields. При DO UPDATE из строк с
+        одинаковым ключом записывается последняя
+        """
         if not data:
             return
         if isinstance(data, dict):
             data = [data]
-        if data:
-            keys = data[0].keys()
+        async with self.staging(table_name, data) as (
+            connection,
+            staging_table,
+            keys,
+        ):
             columns = ", ".join(keys)
-            values_placeholders = ", ".join(
-                f"${i + 1}" for i in range(len(keys))
-            )
-            values = [tuple(item[key] for key in keys) for item in data]
-            if returning_fields:
-                query = (
-                    f"INSERT INTO {table_name} ({columns}) VALUES {', '.join(map(lambda x: str(x).replace('None', 'NULL'),values))} ON "
-                    f"CONFLICT DO NOTHING RETURNING {', '.join(returning_fields)};"
-                )
-                result = await self.pool.fetch(query)
-                print(result)
-                return result
             if conflict_target and update_fields:
                 update_expressions = ", ".join(
                     f"{field} = EXCLUDED.{field}" for field in update_fields
                 )
+                # Временная таблица только заполняется через COPY, поэтому
+                # ctid растет в порядке строк: из дублей ключа остается
+                # последняя, как при построчной вставке
                 query = (
-                    f"INSERT INTO {table_name} ({columns}) VALUES "
-                    f"({values_placeholders}) ON CONFLICT ({conflict_target}) "
-                    f"DO UPDATE SET {update_expressions};"
+                    f"INSERT INTO {table_name} ({columns}) "
+                    f"SELECT DISTINCT ON ({conflict_target}) {columns} "
+                    f"FROM {staging_table} "
+                    f"ORDER BY {conflict_target}, ctid DESC "
+                    f"ON CONFLICT ({conflict_target}) "
+                    f"DO UPDATE SET {update_expressions}"
                 )
             else:
                 query = (
-                    f"INSERT INTO {table_name} ({columns}) VALUES ("
-                    f"{values_placeholders}) ON CONFLICT DO NOTHING;"
+                    f"INSERT INTO {table_name} ({columns}) "
+                    f"SELECT {columns} FROM {staging_table} "
+                    f"ON CONFLICT DO NOTHING"
                 )
-            print("DEBUG QUERY:", query)
-            await self.pool.executemany(query, values)
+            if returning_fields:
+                query += f" RETURNING {', '.join(returning_fields)}"
+                rows = await connection.fetch(query)
+                ROWS_WRITTEN.labels(table_name).inc(len(rows))
+                return rows
+            status = await connection.execute(query)
+            ROWS_WRITTEN.labels(table_name).inc(int(status.split()[-1]))
@@ -0,0 +1,129 @@
+import asyncio
+import datetime
+import heapq
+import logging
+from typing import Iterable
+
+from aiogram import Bot
+
+from database import Database
+
+logger = logging.getLogger(__name__)
+
+BATCH_WINDOW = datetime.timedelta(seconds=0.5)
+DELETE_CONCURRENCY = 10
+
+
+class EphemeralMessages:
+    """
+    Удаление сообщений по истечении времени жизни без блокировки цикла
+    событий. Сроки хранятся в куче таймеров и в бд, чтобы пережить
+    перезапуск, а одновременно истекшие сообщения удаляются пачкой
+    """
+
+    def __init__(
+        self,
+        bot: Bot,
+        db: Database,
+        batch_window: datetime.timedelta = BATCH_WINDOW,
+        concurrency: int = DELETE_CONCURRENCY,
+    ):
+        self._bot = bot
+        self._db = db
+        self._batch_window = batch_window
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._timers: list[tuple[datetime.datetime, int, int]] = []
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task | None = None
+
+    async def start(self):
+        query = "SELECT delete_at, chat_id, message_id FROM ephemeral_messages"
+        for row in await self._db.pool.fetch(query):
+            heapq.heappush(self._timers, tuple(row))
+        self._task = asyncio.create_task(self._run())
+        logger.info(
+            f"Ephemeral messages started, {len(self._timers)} pending"
+        )
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def schedule(
+        self, chat_id: int, message_ids: Iterable[int], ttl: float
+    ):
+        """
+        Планирование удаления сообщений чата через ttl секунд
+        """
+        delete_at = datetime.datetime.now() + datetime.timedelta(seconds=ttl)
+        rows = [
+            {
+                "chat_id": chat_id,
+                "message_id": message_id,
+                "delete_at": delete_at,
+            }
+            for message_id in message_ids
+        ]
+        await self._db.insert_data("ephemeral_messages", rows)
+        for row in rows:
+            heapq.heappush(
+                self._timers, (delete_at, chat_id, row["message_id"])
+            )
+        self._wakeup.set()
+
+    async def _run(self):
+        while True:
+            self._wakeup.clear()
+            if not self._timers:
+                await self._wakeup.wait()
+                continue
+            delay = self._timers[0][0] - datetime.datetime.now()
+            if delay.total_seconds() > 0:
+                try:
+                    await asyncio.wait_for(
+                        self._wakeup.wait(), delay.total_seconds()
+                    )
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            deadline = datetime.datetime.now() + self._batch_window
+            batch = []
+            while self._timers and self._timers[0][0] <= deadline:
+                batch.append(heapq.heappop(self._timers))
+            try:
+                await self._delete_batch(batch)
+            except Exception:
+                logger.error(
+                    "Failed to delete expired messages", exc_info=True
+                )
+
+    async def _delete_batch(
+        self, batch: list[tuple[datetime.datetime, int, int]]
+    ):
+        await asyncio.gather(
+            *(
+                self._delete_message(chat_id, message_id)
+                for _, chat_id, message_id in batch
+            )
+        )
+        query = (
+            "DELETE FROM ephemeral_messages "
+            "WHERE (chat_id, message_id) IN ("
+            "SELECT * FROM unnest($1::bigint[], $2::bigint[]))"
+        )
+        await self._db.pool.execute(
+            query,
+            [chat_id for _, chat_id, _ in batch],
+            [message_id for _, _, message_id in batch],
+        )
+
+    async def _delete_message(self, chat_id: int, message_id: int):
+        async with self._semaphore:
+            try:
+                await self._bot.delete_message(chat_id, message_id)
+            except Exception as e:
+                logger.debug(
+                    f"Failed to delete message {message_id} in {chat_id}: {e}"
+                )
@@ -0,0 +1,41 @@
+from aiogram import F, Router
+from aiogram.filters import Command, CommandObject
+from aiogram.types import FSInputFile, Message
+
+from loader import config, job_profiler
+
+router = Router()
+router.message.filter(F.from_user.id.in_(config.tg_bot.admin_ids))
+
+
+@router.message(Command("profiles"))
+async def process_profiles_command(message: Message):
+    """
+    Список последних профилей расчетов продавцов
+    """
+    profiles = job_profiler.list_profiles()
+    if not profiles:
+        await message.answer("Профилей пока нет")
+        return
+    lines = [
+        f"`{path.name}` ({path.stat().st_size // 1024} КБ)"
+        for path in profiles
+    ]
+    await message.answer(
+        "Последние профили, получить: /profile <имя>\n\n" + "\n".join(lines)
+    )
+
+
+@router.message(Command("profile"))
+async def process_profile_command(message: Message, command: CommandObject):
+    """
+    Отправка профиля файлом, по умолчанию последнего
+    """
+    if command.args:
+        path = job_profiler.get_profile(command.args.strip())
+    else:
+        path = next(iter(job_profiler.list_profiles(limit=1)), None)
+    if path is None:
+        await message.answer("Профиль не найден")
+        return
+    await message.answer_document(FSInputFile(path))
@@ -1,28 +1,51 @@
-import asyncio
 import datetime
-import time
+import logging
+from typing import Awaitable, Callable
 
 from aiogram import F, Router
+from aiogram.exceptions import TelegramBadRequest
 from aiogram.filters import CommandStart
 from aiogram.types import Message, CallbackQuery
-from apscheduler.jobstores.base import ConflictingIdError
-from apscheduler.triggers.cron import CronTrigger
 from jwt import DecodeError
 
-from loader import wb_tariffs_db, scheduler, bot, db, async_session
+from loader import (
+    config,
+    tariffs_store,
+    bot,
+    db,
+    async_session,
+    http_client,
+    outbox,
+    ephemeral_messages,
+    onboarding_queue,
+    job_profiler,
+)
 from logistics_info_processor import LogisticsInfoProcessor
-from sqlalchemy import select, text, func
+from metrics import timed
+from sqlalchemy import select, func, update
 from sqlalchemy.dialects.postgresql import insert
-from utils import split_message
 from wb_data_extractor import WBDataExtractor
-from wb_parser import WBParser
+from wb_parser import (
+    WBParser,
+    WildberriesRateLimitError,
+    WildberriesUnauthorizedError,
+)
 from models import User, Seller
-from wb_token import WildberriesToken
+from wb_token import WildberriesOldTokenTypeException, WildberriesToken
 
 from utils import create_inline_kb
 
+logger = logging.getLogger(__name__)
+
 router = Router()
 SLEEP_TIME_WARNING = 4
+RECONCILE_INTERVAL = datetime.timedelta(days=1)
+RECONCILE_MARGIN = datetime.timedelta(hours=1)
+MOSCOW_TIMEZONE = datetime.timezone(datetime.timedelta(hours=3))
+TOKEN_REVOKED_MESSAGE = (
+    "Wildberries отклоняет твой API-токен, поэтому уведомления "
+    "остановлены. Отправь мне новый токен, чтобы возобновить их"
+)
 TIME_LIST = [
     "07:00",
     "08:00",
@@ -45,32 +68,156 @@ TIME_LIST = [
 
 async def delete_warning(message: Message, text: str):
     bot_message = await message.answer(text=text)
-    time.sleep(SLEEP_TIME_WARNING)
-    await message.delete()
-    await bot_message.delete()
+    await ephemeral_messages.schedule(
+        message.chat.id,
+        (message.message_id, bot_message.message_id),
+        SLEEP_TIME_WARNING,
+    )
 
 
-async def return_info(seller_id: int, api_token: str) -> str | None:
-    wb_parser = WBParser(api_token)
+@timed("build_info")
+async def build_info(
+    seller_id: int,
+    api_token: str,
+    changed_warehouses: list[str] | None = None,
+    progress: Callable[[str], Awaitable[None]] | None = None,
+) -> list[str] | None:
+    wb_parser = WBParser(api_token, http_client.session, config.wb_api)
     wb_data_extractor = WBDataExtractor(wb_parser, db, seller_id)
+    if progress:
+        await progress("Загружаю карточки товаров...")
     await wb_data_extractor.insert_products()
+    if progress:
+        await progress("Проверяю остатки на складах и тарифы...")
     logistics_change_handler = LogisticsInfoProcessor(
-        wb_tariffs_db, db, wb_data_extractor, seller_id
+        tariffs_store, db, wb_data_extractor, seller_id, changed_warehouses
+    )
+    return await logistics_change_handler.return_info()
+
+
+async def return_info(
+    seller_id: int,
+    api_token: str,
+    changed_warehouses: list[str] | None = None,
+    user_tg_id: int | None = None,
+    progress: Callable[[str], Awaitable[None]] | None = None,
+) -> list[str] | None:
+    result_info = await build_info(
+        seller_id, api_token, changed_warehouses, progress
     )
-    result_info = await logistics_change_handler.return_info()
     if result_info:
-        async with async_session() as session:
-            result = await session.execute(
-                select(User).join(User.sellers).where(Seller.id == seller_id)
-            )
-            user_tg_id = result.scalars().first().user_tg_id
-        chunked_message = split_message(result_info)
-        for chunk in chunked_message:
-            await bot.send_message(user_tg_id, chunk)
-    await wb_parser.client.close()
+        if user_tg_id is None:
+            async with async_session() as session:
+                result = await session.execute(
+                    select(User)
+                    .join(User.sellers)
+                    .where(Seller.id == seller_id)
+                )
+                user_tg_id = result.scalars().first().user_tg_id
+        await outbox.send(user_tg_id, result_info)
     return result_info
 
 
+async def check_seller(seller_id: int, api_token: str, chat_id: int):
+    """
+    Первая проверка изменений тарифов для нового продавца с сообщением о
+    ходе проверки. Выполняется в очереди onboarding_queue
+    """
+    status_message = await bot.send_message(
+        chat_id, "Начинаю проверку, это может занять пару минут..."
+    )
+
+    async def progress(text: str):
+        try:
+            await status_message.edit_text(text)
+        except TelegramBadRequest:
+            pass
+
+    try:
+        async with job_profiler.profile("onboarding", seller_id):
+            result = await return_info(
+                seller_id, api_token, user_tg_id=chat_id, progress=progress
+            )
+    except WildberriesUnauthorizedError:
+        await progress(
+            "Wildberries отклонил токен, попробуй отправить другой"
+        )
+        return
+    except WildberriesRateLimitError:
+        await progress(
+            "Wildberries ограничил число запросов, проверю изменения "
+            "в выбранное время"
+        )
+        return
+    if result:
+        await progress("Проверка завершена")
+    else:
+        await progress(
+            "Я все проверил, завтра изменения тарифов не планируются"
+        )
+
+
+async def disable_seller(seller_id: int):
+    """
+    Остановка уведомлений продавца, токен которого отклонен Wildberries,
+    и сообщение пользователю
+    """
+    query = (
+        "WITH disabled AS (UPDATE sellers SET notification_time = NULL "
+        "WHERE id = $1 RETURNING user_id) "
+        "SELECT u.user_tg_id FROM users u JOIN disabled d ON d.user_id = u.id"
+    )
+    user_tg_id = await db.pool.fetchval(query, seller_id)
+    logger.warning(f"Seller {seller_id}: token is rejected, disabled")
+    if user_tg_id is not None:
+        await outbox.send(user_tg_id, [TOKEN_REVOKED_MESSAGE])
+
+
+def is_token_alive(seller) -> bool:
+    """
+    Проверка срока действия токена продавца без запроса к API
+    """
+    try:
+        return not WildberriesToken(seller.get("api_token")).is_expired()
+    except (DecodeError, WildberriesOldTokenTypeException, KeyError):
+        return False
+
+
+async def reconcile_products():
+    """
+    Полная сверка каталога товаров продавцов с выбранным временем
+    уведомлений и действующим токеном, не сверявшихся за
+    RECONCILE_INTERVAL. Выполняется по расписанию в фоне. Запас
+    RECONCILE_MARGIN нужен, чтобы сверка, записанная через несколько секунд
+    после запуска вчера, не пропускалась сегодня
+    """
+    query = (
+        "SELECT id, api_token FROM sellers "
+        "WHERE notification_time IS NOT NULL "
+        "AND (products_reconciled_at IS NULL "
+        "OR products_reconciled_at < $1)"
+    )
+    rows = await db.pool.fetch(
+        query,
+        datetime.datetime.now() - (RECONCILE_INTERVAL - RECONCILE_MARGIN),
+    )
+    sellers = [seller for seller in rows if is_token_alive(seller)]
+    for seller in sellers:
+        wb_parser = WBParser(
+            seller.get("api_token"), http_client.session, config.wb_api
+        )
+        wb_data_extractor = WBDataExtractor(wb_parser, db, seller.get("id"))
+        try:
+            await wb_data_extractor.insert_products(full=True)
+        except WildberriesUnauthorizedError:
+            await disable_seller(seller.get("id"))
+        except WildberriesRateLimitError as e:
+            logger.warning(
+                f"Seller {seller.get('id')}: reconcile skipped, {e}"
+            )
+    logger.info(f"Reconciled products of {len(sellers)} sellers")
+
+
 @router.message(CommandStart())
 async def process_start_command(message: Message):
     async with async_session() as session:
@@ -138,14 +285,7 @@ async def process_api_token(message: Message):
 @router.callback_query(F.data.in_(TIME_LIST))
 async def process_time(callback: CallbackQuery):
     selected_time = datetime.datetime.strptime(callback.data, "%H:%M").time()
-    moscow_timezone = datetime.timezone(datetime.timedelta(hours=3))
-    notification_time = datetime.datetime.combine(
-        datetime.datetime.utcnow().date(), selected_time
-    )
-    notification_time = notification_time.replace(
-        tzinfo=datetime.timezone.utc
-    ).astimezone(moscow_timezone)
-    notification_time += datetime.timedelta(days=1)
+    await callback.answer()
     await callback.message.edit_text(
         text=f"Спасибо! Теперь я буду присылать тебе изменение стоимости логистики для твоих товаров.\n\n"
         f"При наличии изменений в тарифах, уведомления будут приходить в {selected_time.strftime('%H:%M')}\n\n"
@@ -161,34 +301,18 @@ async def process_time(callback: CallbackQuery):
         )
         result = await session.execute(stmt)
         seller = result.scalars().first()
-        await asyncio.sleep(5)
-        result = await return_info(seller.id, seller.api_token)
-        if not result:
-            await callback.message.answer(
-                text="Я все проверил, завтра изменения тарифов не планируются"
-            )
-        try:
-            scheduler.add_job(
-                func=return_info,
-                args=(seller.id, seller.api_token),
-                trigger=CronTrigger(
-                    hour=selected_time.hour,
-                    minute=selected_time.minute,
-                    timezone=moscow_timezone,
-                ),
-                id=str(seller.id),
-                next_run_time=notification_time,
-            )
-        except ConflictingIdError:
-            scheduler.reschedule_job(
-                str(seller.id),
-                trigger=CronTrigger(
-                    hour=selected_time.hour,
-                    minute=selected_time.minute,
-                    timezone=moscow_timezone,
-                ),
-                next_run_time=notification_time,
-            )
+        seller.notification_time = callback.data
+        seller.notified_at = datetime.datetime.now()
+        await session.commit()
+        seller_id, api_token = seller.id, seller.api_token
+    position = onboarding_queue.submit(
+        check_seller, seller_id, api_token, callback.message.chat.id
+    )
+    if position:
+        await callback.message.answer(
+            text=f"Передо мной в очереди еще {position} проверок, "
+            "я напишу, как только начну"
+        )
 
 
 @router.message(F.text.lower() == "стоп")
@@ -201,12 +325,9 @@ async def process_remove_notifications(message: Message):
         )
         result = await session.execute(stmt)
         sellers = result.scalars()
-        query = "SELECT id FROM apscheduler_jobs"
-        result = await session.execute(text(query))
-        jobs_id = result.scalars().all()
         sellers_dict = {}
         for seller in sellers:
-            if str(seller.id) in jobs_id:
+            if seller.notification_time:
                 sellers_dict[str(seller.id)] = (
                     datetime.datetime.strftime(
                         seller.updated_at, "%d.%m.%Y %H:%M"
@@ -227,7 +348,12 @@ async def process_remove_notifications(message: Message):
             )
         elif len(sellers_dict) == 1:
             try:
-                scheduler.remove_job(*sellers_dict)
+                await session.execute(
+                    update(Seller)
+                    .where(Seller.id == int(*sellers_dict))
+                    .values(notification_time=None)
+                )
+                await session.commit()
             finally:
                 await message.answer(
                     text="Окей, я больше не буду присылать тебе уведомления\n\n "
@@ -244,7 +370,17 @@ async def process_remove_notifications(message: Message):
 async def process_remove_notification(callback: CallbackQuery):
     seller_id = callback.data
     try:
-        scheduler.remove_job(str(seller_id))
+        async with async_session() as session:
+            user_ids = select(User.id).where(
+                User.user_tg_id == callback.from_user.id
+            )
+            await session.execute(
+                update(Seller)
+                .where(Seller.id == int(seller_id))
+                .where(Seller.user_id.in_(user_ids))
+                .values(notification_time=None)
+            )
+            await session.commit()
     finally:
         await callback.message.edit_text(
             text="Окей, я больше не буду присылать тебе уведомления\n\n "
@@ -0,0 +1,51 @@
+import logging
+
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+CONNECTIONS_LIMIT = 100
+CONNECTIONS_LIMIT_PER_HOST = 20
+KEEPALIVE_TIMEOUT = 60
+DNS_CACHE_TTL = 300
+TOTAL_TIMEOUT = 120
+CONNECT_TIMEOUT = 10
+READ_TIMEOUT = 60
+
+
+class HTTPClient:
+    """
+    Общая для всего приложения сессия aiohttp с пулом соединений
+    """
+
+    def __init__(self):
+        self._session: aiohttp.ClientSession | None = None
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            raise RuntimeError("HTTP client is not started")
+        return self._session
+
+    async def start(self):
+        connector = aiohttp.TCPConnector(
+            limit=CONNECTIONS_LIMIT,
+            limit_per_host=CONNECTIONS_LIMIT_PER_HOST,
+            keepalive_timeout=KEEPALIVE_TIMEOUT,
+            ttl_dns_cache=DNS_CACHE_TTL,
+        )
+        timeout = aiohttp.ClientTimeout(
+            total=TOTAL_TIMEOUT,
+            sock_connect=CONNECT_TIMEOUT,
+            sock_read=READ_TIMEOUT,
+        )
+        self._session = aiohttp.ClientSession(
+            connector=connector, timeout=timeout
+        )
+        logger.info("HTTP client started")
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+            logger.info("HTTP client closed")
+        self._session = None
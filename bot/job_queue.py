@@ -0,0 +1,69 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable
+
+logger = logging.getLogger(__name__)
+
+WORKERS = 4
+
+
+class JobQueue:
+    """
+    Очередь фоновых задач с ограниченным числом обработчиков
+    """
+
+    def __init__(self, name: str, workers: int = WORKERS):
+        self._name = name
+        self._workers_count = workers
+        self._queue: asyncio.Queue[
+            tuple[Callable[..., Awaitable[Any]], tuple, dict]
+        ] = asyncio.Queue()
+        self._workers: list[asyncio.Task] = []
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    @property
+    def depth(self) -> int:
+        """
+        Количество задач, ожидающих обработчика
+        """
+        return self._queue.qsize()
+
+    async def start(self):
+        self._workers = [
+            asyncio.create_task(self._worker())
+            for _ in range(self._workers_count)
+        ]
+        logger.info(f"Job queue {self._name} started")
+
+    async def stop(self):
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        logger.info(f"Job queue {self._name} stopped, {self.depth} dropped")
+
+    def submit(
+        self, func: Callable[..., Awaitable[Any]], *args, **kwargs
+    ) -> int:
+        """
+        Постановка задачи в очередь. Возвращает количество задач перед ней
+        """
+        position = self._queue.qsize()
+        self._queue.put_nowait((func, args, kwargs))
+        return position
+
+    async def _worker(self):
+        while True:
+            func, args, kwargs = await self._queue.get()
+            try:
+                await func(*args, **kwargs)
+            except Exception:
+                logger.error(
+                    f"Job {func.__name__} in {self._name} failed",
+                    exc_info=True,
+                )
+            finally:
+                self._queue.task_done()
@@ -7,6 +7,12 @@ from sqlalchemy.orm import sessionmaker
 
 from config_data.config import load_config
 from database import Database
+from ephemeral_messages import EphemeralMessages
+from http_client import HTTPClient
+from job_queue import JobQueue
+from outbox import Outbox
+from profiling import JobProfiler
+from tariffs_store import TariffsStore
 
 config = load_config(path=None)
 bot = Bot(token=config.tg_bot.token, parse_mode="Markdown")
@@ -25,6 +31,8 @@ wb_tariffs_db = Database(
     host=config.wb_tariffs_db.db_host,
     port=config.wb_tariffs_db.db_port,
 )
+tariffs_store = TariffsStore(wb_tariffs_db)
+http_client = HTTPClient()
 database_url = f"postgresql+asyncpg://{db.user}:{db.password}@{db.host}:{db.port}/{db.name}"
 engine = create_async_engine(database_url, echo=False)
 async_session = sessionmaker(
@@ -40,4 +48,9 @@ executors = {
 }
 scheduler = AsyncIOScheduler(jobstores=jobstores, executors=executors)
 
+outbox = Outbox(bot, db)
+ephemeral_messages = EphemeralMessages(bot, db)
+onboarding_queue = JobQueue("onboarding")
+job_profiler = JobProfiler(config.profiling)
+
 dp = Dispatcher()
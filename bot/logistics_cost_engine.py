@@ -0,0 +1,57 @@
+from typing import Iterable, Mapping, Sequence
+
+import numpy as np
+
+BASE_VOLUME = 1
+
+
+class LogisticsCostEngine:
+    """
+    Пакетный расчет стоимости логистики по матрице тарифов склады x даты
+    """
+
+    def __init__(
+        self,
+        tariffs_by_date: Sequence[Mapping[str, Mapping]],
+        warehouses: Iterable[str],
+    ):
+        self.warehouses = list(dict.fromkeys(warehouses))
+        self.warehouse_index = {
+            name: index for index, name in enumerate(self.warehouses)
+        }
+        shape = (len(self.warehouses), len(tariffs_by_date))
+        self._base_rate = np.full(shape, np.nan)
+        self._liter_rate = np.full(shape, np.nan)
+        self._coefficient = np.full(shape, np.nan)
+        for date_index, tariffs in enumerate(tariffs_by_date):
+            for index, warehouse in enumerate(self.warehouses):
+                tariff = tariffs.get(warehouse)
+                if tariff is None:
+                    continue
+                self._base_rate[index, date_index] = float(
+                    tariff.get("box_delivery_base")
+                )
+                self._liter_rate[index, date_index] = float(
+                    tariff.get("box_delivery_liter")
+                )
+                self._coefficient[index, date_index] = (
+                    float(tariff.get("box_delivery_and_storage_expr")) / 100
+                )
+
+    def calculate(
+        self,
+        volumes: np.ndarray,
+        product_indexes: np.ndarray,
+        warehouse_indexes: np.ndarray,
+    ) -> np.ndarray:
+        """
+        Расчет стоимости логистики для пар товар-склад на все даты матрицы.
+        Возвращает массив (пары x даты) без округления, NaN там, где нет
+        тарифа склада
+        """
+        volumes = np.asarray(volumes, dtype=float)[product_indexes, None]
+        base_rate = self._base_rate[warehouse_indexes]
+        liter_rate = self._liter_rate[warehouse_indexes]
+        coefficient = self._coefficient[warehouse_indexes]
+        extra_volume = np.maximum(volumes - BASE_VOLUME, 0)
+        return (base_rate + extra_volume * liter_rate) * coefficient
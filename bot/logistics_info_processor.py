@@ -1,135 +1,233 @@
 import datetime
 import logging
-from typing import Any
+from typing import Iterator
+
+import numpy as np
 
 from database import Database
+from logistics_cost_engine import LogisticsCostEngine
+from message_renderer import render_chunks, render_product
+from metrics import timed
+from records import RelevantProduct
+from tariffs_store import TariffsSnapshot, TariffsStore
 from wb_data_extractor import WBDataExtractor
+from wb_parser import (
+    WildberriesAPIError,
+    WildberriesRateLimitError,
+    WildberriesUnauthorizedError,
+)
 
-BASE_VOLUME = 1
+UNAFFECTED_MESSAGE = (
+    "Изменения тарифов, которые произойдут завтра, вас не коснутся!"
+)
+CHANGES_HEADER = (
+    "Стоимость логистики для следующих товаров завтра изменится:\n\n"
+)
 
 
 class LogisticsInfoProcessor:
     def __init__(
         self,
-        wb_tariffs_db: Database,
+        tariffs_store: TariffsStore,
         db: Database,
         data_extractor: WBDataExtractor,
         seller_id: int,
+        changed_warehouses: list[str] | None = None,
     ):
         self._seller_id = seller_id
-        self._wb_tariffs_db = wb_tariffs_db
+        self._changed_warehouses = changed_warehouses
+        self._tariffs_store = tariffs_store
         self._data_extractor = data_extractor
         self._db = db
-        self._tariffs_cache = {}
 
-    async def get_stocks(self) -> set[tuple[int, str]]:
+    async def get_stocks(
+        self, warehouses_names: list[str] | None = None
+    ) -> set[tuple[int, str]]:
         """
-        Получение данных об остатках на складах и занесение данных в бд
+        Синхронизация остатков с API и возврат текущих остатков продавца
+        из бд, при необходимости только на указанных складах. Если токен
+        отозван или лимит запросов исчерпан, ошибка передается дальше, а
+        не считается по устаревшим остаткам
         """
-        stocks_data = await self._data_extractor.extract_warehouses_stocks()
-        stocks_list = []
         try:
-            await self._db.insert_data("stocks", stocks_data)
+            await self._data_extractor.extract_warehouses_stocks()
+        except (WildberriesUnauthorizedError, WildberriesRateLimitError):
+            raise
+        except WildberriesAPIError as e:
+            logging.error(
+                f"Не получилось загрузить остатки продавца "
+                f"{self._seller_id}: {e}"
+            )
         except Exception:
-            logging.error("Не получилось записать данные в бд", exc_info=True)
-        for stock in stocks_data:
-            if stock.get("quantity"):
-                stocks_list.append(
-                    (stock.get("product_id"), stock.get("warehouse_name"))
-                )
-        return set(stocks_list)
+            logging.error(
+                "Не получилось записать данные в бд", exc_info=True
+            )
+        query = (
+            "SELECT DISTINCT product_id, warehouse_name "
+            "FROM current_stocks WHERE seller_id = $1 AND quantity > 0 "
+            "AND ($2::text[] IS NULL OR warehouse_name = ANY($2))"
+        )
+        stocks = await self._db.pool.fetch(
+            query, self._seller_id, warehouses_names
+        )
+        return {
+            (product_id, warehouse_name)
+            for product_id, warehouse_name in stocks
+        }
 
     async def get_tariffs(
-        self, date: datetime.date = datetime.date.today()
-    ) -> list[dict]:
+        self, date: datetime.date | None = None
+    ) -> TariffsSnapshot:
         """
-        Получение тарифов на дату
+        Получение тарифов на дату, по умолчанию на сегодня
         """
-        if date in self._tariffs_cache:
-            return self._tariffs_cache[date]
-        query = "SELECT * FROM wb_warehouses_tariffs WHERE date = $1"
-        tariffs = await self._wb_tariffs_db.pool.fetch(query, date)
-        self._tariffs_cache = {date: tariffs}
-        return tariffs
+        return await self._tariffs_store.get(date or datetime.date.today())
 
     async def check_changes(self) -> list[str | None]:
         """
-        Проверка изменения тарифов и возврат списка с названиями складов
+        Проверка изменения тарифов и возврат списка с названиями складов.
+        Если список передан при создании, он используется без запроса
         """
+        if self._changed_warehouses is not None:
+            return self._changed_warehouses
         tariffs = await self.get_tariffs(
             datetime.date.today() + datetime.timedelta(days=1)
         )
-        warehouses_data = []
-        for tariff in tariffs:
-            if tariff.get("box_delivery_and_storage_diff_sign"):
-                warehouses_data.append(tariff.get("warehouse_name"))
-        return warehouses_data
+        return tariffs.changed_warehouses
 
-    async def get_relevant_stocks(self) -> list[tuple[int, str]]:
+    async def get_relevant_stocks(self) -> set[tuple[int, str]]:
         """
         Получение данных об остатках на складах у которых будет изменен коэффициент
         """
-        stocks = await self.get_stocks()
         warehouses_names = await self.check_changes()
-        relevant_stocks = []
-        for stock in stocks:
-            if stock[1] in warehouses_names:
-                relevant_stocks.append(stock)
-        return relevant_stocks
+        return await self.get_stocks(warehouses_names)
 
-    async def get_relevant_products(
-        self,
-    ) -> dict[Any, dict[str, list[str] | Any]]:
+    @timed("get_relevant_products")
+    async def get_relevant_products(self) -> dict[int, RelevantProduct]:
         """
         Получение данных о товарах, которые будут затронуты изменением тарифов
         """
-        relevant_stocks = set(await self.get_relevant_stocks())
-        query = "SELECT * FROM products WHERE seller_id = $1"
-        products = await self._db.pool.fetch(query, self._seller_id)
-        relevant_products = {}
-        for stock in relevant_stocks:
-            product = next(
-                product
-                for product in products
-                if stock[0] == product.get("id")
+        relevant_stocks = sorted(await self.get_relevant_stocks())
+        query = (
+            "SELECT id, nm_id, vendor_code, title, length, width, height "
+            "FROM products WHERE seller_id = $1 AND id = ANY($2)"
+        )
+        products = {
+            product["id"]: product
+            for product in await self._db.pool.fetch(
+                query,
+                self._seller_id,
+                list({product_id for product_id, _ in relevant_stocks}),
             )
-            if product:
-                nm_id = product.get("nm_id")
-                if nm_id not in relevant_products:
-                    product_data = {
-                        "vendor_code": product.get("vendor_code"),
-                        "title": product.get("title"),
-                        "length": product.get("length"),
-                        "width": product.get("width"),
-                        "height": product.get("height"),
-                        "warehouse_name": [stock[1]],
-                    }
-                    relevant_products[nm_id] = product_data
-                else:
-                    relevant_products[nm_id]["warehouse_name"].append(stock[1])
+        }
+        relevant_products = {}
+        for product_id, warehouse_name in relevant_stocks:
+            product = products.get(product_id)
+            if product is None:
+                continue
+            nm_id = product["nm_id"]
+            relevant_product = relevant_products.get(nm_id)
+            if relevant_product is None:
+                relevant_product = relevant_products[nm_id] = RelevantProduct(
+                    nm_id,
+                    product["vendor_code"],
+                    product["title"],
+                    product["length"],
+                    product["width"],
+                    product["height"],
+                )
+            relevant_product.warehouses.append(warehouse_name)
         return relevant_products
 
-    async def calculete_logistics(
+    @timed("calculate_costs")
+    def calculate_costs(
         self,
-        volume: float,
-        warehouse_coefficient: float,
-        base_rate: float,
-        litter_rate: float,
-    ) -> float:
-        """
-        Расчет стоимости логистики
-        """
-        if volume > BASE_VOLUME:
-            base_logistics = (
-                base_rate + (volume - BASE_VOLUME) * litter_rate
-            ) * warehouse_coefficient
-        else:
-            base_logistics = base_rate * warehouse_coefficient
-        return base_logistics
+        relevant_products: dict[int, RelevantProduct],
+        todays_tariffs: TariffsSnapshot,
+        tomorrows_tariffs: TariffsSnapshot,
+    ) -> dict[tuple[int, str], tuple[float, float]]:
+        """
+        Расчет стоимости логистики на сегодня и завтра для всех пар
+        товар-склад за один проход. Округление встроенным round, так как
+        np.round расходится с ним на половинах копейки
+        """
+        volumes = []
+        product_indexes = []
+        warehouses = []
+        pairs = []
+        for product_index, (nm_id, product) in enumerate(
+            relevant_products.items()
+        ):
+            volumes.append(product.volume)
+            for warehouse in product.warehouses:
+                product_indexes.append(product_index)
+                warehouses.append(warehouse)
+                pairs.append((nm_id, warehouse))
+        engine = LogisticsCostEngine(
+            (todays_tariffs.by_warehouse, tomorrows_tariffs.by_warehouse),
+            warehouses,
+        )
+        costs = engine.calculate(
+            np.array(volumes),
+            np.array(product_indexes, dtype=np.intp),
+            np.array(
+                [engine.warehouse_index[name] for name in warehouses],
+                dtype=np.intp,
+            ),
+        )
+        missing = np.isnan(costs).any(axis=1)
+        if missing.any():
+            logging.warning(
+                f"Seller {self._seller_id}: no tariffs for warehouses "
+                f"{set(np.array(warehouses)[missing])}"
+            )
+        return {
+            pair: (round(float(cost[0]), 2), round(float(cost[1]), 2))
+            for pair, cost, is_missing in zip(pairs, costs, missing)
+            if not is_missing
+        }
 
-    async def return_info(self) -> str | None:
+    def render_products(
+        self,
+        relevant_products: dict[int, RelevantProduct],
+        costs: dict[tuple[int, str], tuple[float, float]],
+    ) -> Iterator[str]:
+        """
+        Блоки сообщения по товарам в порядке relevant_products
+        """
+        for index, (nm_id, product) in enumerate(relevant_products.items()):
+            product_costs = (
+                (warehouse, *costs[(nm_id, warehouse)])
+                for warehouse in product.warehouses
+                if (nm_id, warehouse) in costs
+            )
+            yield render_product(
+                index + 1,
+                nm_id,
+                product.title,
+                product.vendor_code,
+                product_costs,
+            )
+
+    @timed("render")
+    def render_message(
+        self,
+        relevant_products: dict[int, RelevantProduct],
+        costs: dict[tuple[int, str], tuple[float, float]],
+    ) -> list[str]:
         """
-        Возврат информации об изменении тарифов
+        Сообщение об изменении стоимости логистики, разбитое на куски
+        допустимого в Telegram размера без разрыва блоков товаров
+        """
+        return list(
+            render_chunks(
+                CHANGES_HEADER, self.render_products(relevant_products, costs)
+            )
+        )
+
+    async def return_info(self) -> list[str] | None:
+        """
+        Возврат информации об изменении тарифов, разбитой на сообщения
         """
         todays_tariffs = await self.get_tariffs()
         tomorrows_tariffs = await self.get_tariffs(
@@ -138,63 +236,8 @@ class LogisticsInfoProcessor:
         if await self.check_changes():
             relevant_products = await self.get_relevant_products()
             if relevant_products:
-                message = "Стоимость логистики для следующих товаров завтра изменится:\n\n"
-                for index, product in enumerate(relevant_products):
-                    nm_id = product
-                    product = relevant_products.get(nm_id)
-                    product_title = product.get("title")
-                    vendor_code = product.get("vendor_code")
-                    volume = (
-                        product.get("length")
-                        * product.get("width")
-                        * product.get("height")
-                    ) / 1000
-
-                    url = f"https://www.wildberries.ru/catalog/{nm_id}/detail.aspx"
-                    message += f"{index + 1}. [{product_title} ({vendor_code})]({url})\n"
-
-                    warehouse_name = product.get("warehouse_name")
-                    for warehouse in warehouse_name:
-                        todays_tariff = next(
-                            tariff
-                            for tariff in todays_tariffs
-                            if tariff.get("warehouse_name") == warehouse
-                        )
-                        tomorrows_tariff = next(
-                            tariff
-                            for tariff in tomorrows_tariffs
-                            if tariff.get("warehouse_name") == warehouse
-                        )
-                        logistics_cost = []
-                        for tariff in (todays_tariff, tomorrows_tariff):
-                            warehouse_coefficient = (
-                                float(
-                                    tariff.get("box_delivery_and_storage_expr")
-                                )
-                                / 100
-                            )
-                            base_rate = float(tariff.get("box_delivery_base"))
-                            litter_rate = float(
-                                tariff.get("box_delivery_liter")
-                            )
-                            logistics = round(
-                                await self.calculete_logistics(
-                                    volume,
-                                    warehouse_coefficient,
-                                    base_rate,
-                                    litter_rate,
-                                ),
-                                2,
-                            )
-                            logistics_cost.append(logistics)
-                        current_logistics = logistics_cost[0]
-                        next_logistics = logistics_cost[1]
-                        if current_logistics < next_logistics:
-                            message += "- 🔴 "
-                        else:
-                            message += "- 🟢 "
-                        message += f"{warehouse}: {current_logistics}₽ -> {next_logistics}₽\n"
-                    message += "\n"
-                return message
-            message = "Изменения тарифов, которые произойдут завтра, вас не коснутся!"
-            return message
+                costs = self.calculate_costs(
+                    relevant_products, todays_tariffs, tomorrows_tariffs
+                )
+                return self.render_message(relevant_products, costs)
+            return [UNAFFECTED_MESSAGE]
@@ -0,0 +1,93 @@
+from typing import Iterable, Iterator
+
+MAX_MESSAGE_LENGTH = 4096
+PRODUCT_URL = "https://www.wildberries.ru/catalog/{nm_id}/detail.aspx"
+
+_MARKDOWN_ESCAPES = str.maketrans(
+    {"_": "\\_", "*": "\\*", "`": "\\`", "[": "\\["}
+)
+_LINK_TEXT_ESCAPES = str.maketrans({"[": "(", "]": ")"})
+
+
+def escape_markdown(text: str) -> str:
+    """
+    Экранирование разметки Markdown вне ссылок
+    """
+    return str(text).translate(_MARKDOWN_ESCAPES)
+
+
+def escape_link_text(text: str) -> str:
+    """
+    Внутри текста ссылки экранирование не работает, поэтому квадратные
+    скобки, закрывающие ссылку раньше времени, заменяются на круглые
+    """
+    return str(text).translate(_LINK_TEXT_ESCAPES)
+
+
+def render_product(
+    index: int,
+    nm_id: int,
+    title: str,
+    vendor_code: str,
+    costs: Iterable[tuple[str, float, float]],
+) -> str:
+    """
+    Блок сообщения об одном товаре: ссылка и строки по складам
+    """
+    url = PRODUCT_URL.format(nm_id=nm_id)
+    link_text = escape_link_text(f"{title} ({vendor_code})")
+    lines = [f"{index}. [{link_text}]({url})"]
+    for warehouse, current_cost, next_cost in costs:
+        mark = "🔴" if current_cost < next_cost else "🟢"
+        lines.append(
+            f"- {mark} {escape_markdown(warehouse)}: "
+            f"{current_cost}₽ -> {next_cost}₽"
+        )
+    lines.append("\n")
+    return "\n".join(lines)
+
+
+def render_chunks(
+    header: str,
+    blocks: Iterable[str],
+    max_length: int = MAX_MESSAGE_LENGTH,
+) -> Iterator[str]:
+    """
+    Сборка сообщения из блоков в куски не длиннее max_length по мере
+    поступления блоков. Блок целиком переносится в следующий кусок и
+    делится по строкам, только если сам не помещается в одно сообщение.
+    Заголовок не отправляется отдельно: если первый блок не помещается
+    после него, блок делится, а слишком длинные строки делятся на части
+    """
+    parts = [header]
+    length = len(header)
+    only_header = bool(header)
+    for block in blocks:
+        if length + len(block) > max_length and length and not only_header:
+            yield "".join(parts)
+            parts, length = [], 0
+        if length + len(block) <= max_length:
+            parts.append(block)
+            length += len(block)
+            only_header = False
+            continue
+        for line in block.splitlines(keepends=True):
+            while line:
+                if (
+                    length + len(line) > max_length
+                    and length
+                    and not only_header
+                    and len(line) <= max_length
+                ):
+                    yield "".join(parts)
+                    parts, length = [], 0
+                piece = line[: max_length - length]
+                parts.append(piece)
+                length += len(piece)
+                only_header = False
+                line = line[len(piece) :]
+                if line:
+                    yield "".join(parts)
+                    parts, length = [], 0
+    if length:
+        yield "".join(parts)
@@ -0,0 +1,178 @@
+import functools
+import inspect
+import logging
+import time
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Any, Callable, Iterator
+
+from aiohttp import web
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+)
+from prometheus_client.core import GaugeMetricFamily
+
+from config_data.config import MetricsConfig
+
+if TYPE_CHECKING:
+    from database import Database
+    from job_queue import JobQueue
+    from outbox import Outbox
+
+logger = logging.getLogger(__name__)
+
+STAGE_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 180)
+
+STAGE_SECONDS = Histogram(
+    "bot_stage_seconds",
+    "Время выполнения этапов обработки продавца",
+    ["stage"],
+    buckets=STAGE_BUCKETS,
+)
+WB_REQUEST_SECONDS = Histogram(
+    "bot_wb_request_seconds",
+    "Время запросов к API Wildberries",
+    ["api"],
+    buckets=STAGE_BUCKETS,
+)
+WB_STREAM_SECONDS = Histogram(
+    "bot_wb_stream_seconds",
+    "Время чтения и разбора потоковых ответов API Wildberries без "
+    "обработки строк вызывающим",
+    ["api"],
+    buckets=STAGE_BUCKETS,
+)
+WB_RESPONSES = Counter(
+    "bot_wb_responses",
+    "Ответы API Wildberries по кодам, error - сетевые ошибки",
+    ["api", "status"],
+)
+ROWS_WRITTEN = Counter(
+    "bot_rows_written",
+    "Строки, записанные в бд",
+    ["table"],
+)
+SLOT_SELLERS_IN_PROGRESS = Gauge(
+    "bot_slot_sellers_in_progress",
+    "Продавцы слота, для которых идет расчет",
+    ["slot"],
+)
+SLOT_SELLERS_WAITING = Gauge(
+    "bot_slot_sellers_waiting",
+    "Продавцы слота, ожидающие свободного места для расчета",
+    ["slot"],
+)
+
+
+@contextmanager
+def track(stage: str) -> Iterator[None]:
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_SECONDS.labels(stage).observe(time.perf_counter() - start)
+
+
+def timed(stage: str):
+    """
+    Декоратор функции или корутины для замера этапа stage
+    """
+
+    def decorator(func: Callable[..., Any]) -> Callable[..., Any]:
+        if inspect.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with track(stage):
+                    return await func(*args, **kwargs)
+
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with track(stage):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+class RuntimeCollector:
+    """
+    Состояние пулов соединений и очередей, собираемое в момент запроса
+    метрик
+    """
+
+    def __init__(
+        self,
+        pools: dict[str, "Database"],
+        outbox: "Outbox",
+        queues: list["JobQueue"],
+    ):
+        self._pools = pools
+        self._outbox = outbox
+        self._queues = queues
+
+    def collect(self):
+        connections = GaugeMetricFamily(
+            "bot_db_pool_connections",
+            "Соединения пулов asyncpg",
+            labels=["pool", "state"],
+        )
+        for name, db in self._pools.items():
+            if db.pool is None:
+                continue
+            size = db.pool.get_size()
+            idle = db.pool.get_idle_size()
+            connections.add_metric([name, "used"], size - idle)
+            connections.add_metric([name, "idle"], idle)
+            connections.add_metric([name, "max"], db.pool.get_max_size())
+        yield connections
+
+        yield GaugeMetricFamily(
+            "bot_outbox_depth",
+            "Сообщения, ожидающие отправки",
+            value=self._outbox.depth,
+        )
+        yield GaugeMetricFamily(
+            "bot_outbox_lag_seconds",
+            "Время ожидания самого старого неотправленного сообщения",
+            value=self._outbox.lag,
+        )
+        queues = GaugeMetricFamily(
+            "bot_job_queue_depth",
+            "Задачи, ожидающие обработчика",
+            labels=["queue"],
+        )
+        for queue in self._queues:
+            queues.add_metric([queue.name], queue.depth)
+        yield queues
+
+
+async def metrics_handler(request: web.Request) -> web.Response:
+    return web.Response(
+        body=generate_latest(REGISTRY),
+        headers={"Content-Type": CONTENT_TYPE_LATEST},
+    )
+
+
+async def start_metrics_server(
+    config: MetricsConfig, collector: RuntimeCollector
+) -> web.AppRunner:
+    """
+    Регистрация сборщика состояния и запуск HTTP сервера метрик в цикле
+    событий бота, чтобы состояние очередей читалось из того же потока
+    """
+    REGISTRY.register(collector)
+    app = web.Application()
+    app.router.add_get("/metrics", metrics_handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, config.host, config.port).start()
+    logger.info(f"Metrics are served on {config.host}:{config.port}")
+    return runner
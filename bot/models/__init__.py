@@ -6,6 +6,11 @@ __all__ = (
     "Seller",
     "Product",
     "Stock",
+    "CurrentStock",
+    "OutboxMessage",
+    "EphemeralMessage",
+    "PreparedNotification",
+    "WarehouseStockIndex",
 )
 
 from .base import Base
@@ -17,3 +22,13 @@ from .seller import Seller
 from .product import Product
 
 from .stock import Stock
+
+from .current_stock import CurrentStock
+
+from .outbox_message import OutboxMessage
+
+from .ephemeral_message import EphemeralMessage
+
+from .prepared_notification import PreparedNotification
+
+from .warehouse_stock_index import WarehouseStockIndex
@@ -0,0 +1,42 @@
+import datetime
+from typing import TYPE_CHECKING
+
+from sqlalchemy import ForeignKey, UniqueConstraint, TIMESTAMP
+from sqlalchemy.orm import Mapped, mapped_column, relationship
+
+from .base import Base
+
+if TYPE_CHECKING:
+    from .product import Product
+    from .seller import Seller
+
+
+class CurrentStock(Base):
+    __tablename__ = "current_stocks"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    seller_id: Mapped[int] = mapped_column(ForeignKey("sellers.id"))
+    product_id: Mapped[int] = mapped_column(ForeignKey("products.id"))
+    warehouse_name: Mapped[str]
+    tech_size: Mapped[str] = mapped_column(server_default="")
+    barcode: Mapped[str | None]
+    quantity: Mapped[int | None]
+    in_way_to_client: Mapped[int | None]
+    in_way_from_client: Mapped[int | None]
+    quantity_full: Mapped[int | None]
+    last_change_date: Mapped[datetime.datetime | None] = mapped_column(
+        TIMESTAMP
+    )
+
+    __table_args__ = (
+        UniqueConstraint(
+            "seller_id",
+            "product_id",
+            "warehouse_name",
+            "tech_size",
+            name="current_stocks_seller_product_warehouse_size_key",
+        ),
+    )
+
+    seller: Mapped["Seller"] = relationship()
+    product: Mapped["Product"] = relationship()
@@ -0,0 +1,14 @@
+import datetime
+
+from sqlalchemy import BigInteger, TIMESTAMP
+from sqlalchemy.orm import Mapped, mapped_column
+
+from .base import Base
+
+
+class EphemeralMessage(Base):
+    __tablename__ = "ephemeral_messages"
+
+    chat_id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    message_id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    delete_at: Mapped[datetime.datetime] = mapped_column(TIMESTAMP)
@@ -0,0 +1,19 @@
+import datetime
+
+from sqlalchemy import ARRAY, Date, ForeignKey, Text, TIMESTAMP
+from sqlalchemy.orm import Mapped, mapped_column
+
+from .base import Base
+
+
+class PreparedNotification(Base):
+    __tablename__ = "prepared_notifications"
+
+    seller_id: Mapped[int] = mapped_column(
+        ForeignKey("sellers.id"), primary_key=True
+    )
+    tariffs_date: Mapped[datetime.date] = mapped_column(
+        Date, primary_key=True
+    )
+    chunks: Mapped[list[str] | None] = mapped_column(ARRAY(Text))
+    created_at: Mapped[datetime.datetime] = mapped_column(TIMESTAMP)
@@ -6,6 +6,7 @@ from sqlalchemy import (
     Text,
     JSON,
     TIMESTAMP,
+    LargeBinary,
 )
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
@@ -38,6 +39,7 @@ class Product(Base):
     tags: Mapped[dict | None] = mapped_column(JSON)
     created_at: Mapped[datetime.datetime | None] = mapped_column(TIMESTAMP)
     updated_at: Mapped[datetime.datetime | None] = mapped_column(TIMESTAMP)
+    content_hash: Mapped[bytes | None] = mapped_column(LargeBinary)
 
     __table_args__ = (
         UniqueConstraint("seller_id", "nm_id", name="seller_nm_id_key"),
@@ -6,6 +6,7 @@ from sqlalchemy import (
     String,
     UniqueConstraint,
     TIMESTAMP,
+    false,
 )
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
@@ -23,6 +24,23 @@ class Seller(Base):
     api_token: Mapped[str] = mapped_column(String(450))
     added_at: Mapped[datetime.datetime] = mapped_column(TIMESTAMP)
     updated_at: Mapped[datetime.datetime | None] = mapped_column(TIMESTAMP)
+    products_synced_at: Mapped[datetime.datetime | None] = mapped_column(
+        TIMESTAMP
+    )
+    products_reconciled_at: Mapped[datetime.datetime | None] = mapped_column(
+        TIMESTAMP
+    )
+    stocks_synced_at: Mapped[datetime.datetime | None] = mapped_column(
+        TIMESTAMP
+    )
+    stocks_unmatched: Mapped[bool] = mapped_column(server_default=false())
+    stocks_checked_at: Mapped[datetime.datetime | None] = mapped_column(
+        TIMESTAMP
+    )
+    notification_time: Mapped[str | None] = mapped_column(
+        String(5), index=True
+    )
+    notified_at: Mapped[datetime.datetime | None] = mapped_column(TIMESTAMP)
 
     __table_args__ = (
         UniqueConstraint("api_token", "user_id", name="user_token_key"),
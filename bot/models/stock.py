@@ -41,7 +41,8 @@ class Stock(Base):
             "last_change_date",
             "warehouse_name",
             "product_id",
-            name="seller_product_warehouse_change_date_key",
+            "tech_size",
+            name="seller_product_warehouse_size_change_date_key",
         ),
     )
 
@@ -0,0 +1,25 @@
+from typing import TYPE_CHECKING
+
+from sqlalchemy import ForeignKey
+from sqlalchemy.orm import Mapped, mapped_column, relationship
+
+from .base import Base
+
+if TYPE_CHECKING:
+    from .product import Product
+    from .seller import Seller
+
+
+class WarehouseStockIndex(Base):
+    __tablename__ = "warehouse_stock_index"
+
+    warehouse_name: Mapped[str] = mapped_column(primary_key=True)
+    seller_id: Mapped[int] = mapped_column(
+        ForeignKey("sellers.id"), primary_key=True
+    )
+    product_id: Mapped[int] = mapped_column(
+        ForeignKey("products.id"), primary_key=True
+    )
+
+    seller: Mapped["Seller"] = relationship()
+    product: Mapped["Product"] = relationship()
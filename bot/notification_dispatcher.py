@@ -0,0 +1,287 @@
+import asyncio
+import datetime
+import logging
+import time
+
+from apscheduler.triggers.cron import CronTrigger
+
+from handlers.handlers import (
+    TIME_LIST,
+    MOSCOW_TIMEZONE,
+    build_info,
+    disable_seller,
+    return_info,
+)
+from loader import db, scheduler, tariffs_store, outbox, job_profiler
+from logistics_info_processor import UNAFFECTED_MESSAGE
+from metrics import SLOT_SELLERS_IN_PROGRESS, SLOT_SELLERS_WAITING, timed
+from wb_parser import WildberriesUnauthorizedError
+
+logger = logging.getLogger(__name__)
+
+SLOT_CONCURRENCY = 10
+
+# Дата тарифов -> время начала расчета уведомлений на нее
+_prepared_dates: dict[datetime.date, datetime.datetime] = {}
+
+
+async def run_seller(
+    semaphore: asyncio.Semaphore,
+    slot: str,
+    seller: dict,
+    changed_warehouses: list[str],
+):
+    with SLOT_SELLERS_WAITING.labels(slot).track_inprogress():
+        await semaphore.acquire()
+    try:
+        with SLOT_SELLERS_IN_PROGRESS.labels(slot).track_inprogress():
+            async with job_profiler.profile("slot", seller.get("id"), slot):
+                try:
+                    await return_info(
+                        seller.get("id"),
+                        seller.get("api_token"),
+                        changed_warehouses=changed_warehouses,
+                        user_tg_id=seller.get("user_tg_id"),
+                    )
+                except WildberriesUnauthorizedError:
+                    await disable_seller(seller.get("id"))
+                    raise
+        query = "UPDATE sellers SET notified_at = $2 WHERE id = $1"
+        await db.pool.execute(
+            query, seller.get("id"), datetime.datetime.now()
+        )
+    finally:
+        semaphore.release()
+
+
+async def send_prepared(sellers: list[dict]):
+    """
+    Отправка заранее рассчитанных уведомлений. Продавцам без
+    рассчитанного уведомления, у которых нет остатков на складах с
+    изменениями, отправляется UNAFFECTED_MESSAGE
+    """
+    for seller in sellers:
+        chunks = seller.get("prepared_chunks") or [UNAFFECTED_MESSAGE]
+        await outbox.send(seller.get("user_tg_id"), chunks)
+    query = "UPDATE sellers SET notified_at = $2 WHERE id = ANY($1)"
+    await db.pool.execute(
+        query,
+        [seller.get("id") for seller in sellers],
+        datetime.datetime.now(),
+    )
+
+
+def is_unaffected(seller: dict, prepared_at: datetime.datetime) -> bool:
+    """
+    Продавец без рассчитанного уведомления, индекс складов которого
+    обновлен после начала расчета и не содержит складов с изменениями
+    """
+    stocks_checked_at = seller.get("stocks_checked_at")
+    return (
+        not seller.get("is_prepared")
+        and not seller.get("is_affected")
+        and stocks_checked_at is not None
+        and stocks_checked_at >= prepared_at
+    )
+
+
+@timed("run_slot")
+async def run_slot(slot: str):
+    """
+    Рассылка уведомлений всем продавцам, выбравшим время slot. Изменения
+    тарифов вычисляются один раз на весь слот. Если уведомления на завтра
+    уже рассчитаны по событию из бд тарифов, они только отправляются.
+    Продавцу без рассчитанного уведомления сразу отправляется
+    UNAFFECTED_MESSAGE, только если его остатки синхронизированы после
+    начала расчета и индекс складов не содержит складов с изменениями,
+    иначе он рассчитывается заново
+    """
+    started_at = time.monotonic()
+    tomorrow = datetime.date.today() + datetime.timedelta(days=1)
+    tariffs = await tariffs_store.get(tomorrow)
+    changed_warehouses = tariffs.changed_warehouses
+    if not changed_warehouses:
+        logger.info(f"Slot {slot}: no tariff changes tomorrow")
+        return
+    query = (
+        "SELECT s.id, s.api_token, u.user_tg_id, "
+        "p.seller_id IS NOT NULL AS is_prepared, p.chunks AS prepared_chunks, "
+        "s.stocks_checked_at, EXISTS (SELECT 1 FROM warehouse_stock_index i "
+        "WHERE i.seller_id = s.id AND i.warehouse_name = ANY($4)) "
+        "AS is_affected "
+        "FROM sellers s "
+        "JOIN users u ON u.id = s.user_id "
+        "LEFT JOIN prepared_notifications p "
+        "ON p.seller_id = s.id AND p.tariffs_date = $3 "
+        "WHERE s.notification_time = $1 "
+        "AND (s.notified_at IS NULL OR s.notified_at < $2)"
+    )
+    sellers = await db.pool.fetch(
+        query,
+        slot,
+        datetime.datetime.combine(datetime.date.today(), datetime.time()),
+        tomorrow,
+        changed_warehouses,
+    )
+    pending_sellers = sellers
+    prepared_at = _prepared_dates.get(tomorrow)
+    if prepared_at is not None:
+        pending_sellers, prepared_sellers = [], []
+        for seller in sellers:
+            if seller.get("prepared_chunks") or is_unaffected(
+                seller, prepared_at
+            ):
+                prepared_sellers.append(seller)
+            else:
+                pending_sellers.append(seller)
+        await send_prepared(prepared_sellers)
+    semaphore = asyncio.Semaphore(SLOT_CONCURRENCY)
+    results = await asyncio.gather(
+        *(
+            run_seller(semaphore, slot, seller, changed_warehouses)
+            for seller in pending_sellers
+        ),
+        return_exceptions=True,
+    )
+    for seller, result in zip(pending_sellers, results):
+        if isinstance(result, Exception):
+            logger.error(
+                f"Slot {slot}: seller {seller.get('id')} failed",
+                exc_info=result,
+            )
+    failed = sum(isinstance(result, Exception) for result in results)
+    logger.info(
+        f"Slot {slot}: {len(sellers)} sellers processed in "
+        f"{time.monotonic() - started_at:.1f}s, "
+        f"{len(sellers) - len(pending_sellers)} prepared, {failed} failed"
+    )
+
+
+async def get_affected_sellers(warehouses_names: list[str]) -> list[dict]:
+    """
+    Продавцы с уведомлениями, у которых по данным последней синхронизации
+    есть остатки на указанных складах
+    """
+    query = (
+        "SELECT s.id, s.api_token FROM sellers s "
+        "WHERE s.notification_time IS NOT NULL AND s.id IN ("
+        "SELECT seller_id FROM warehouse_stock_index "
+        "WHERE warehouse_name = ANY($1))"
+    )
+    return await db.pool.fetch(query, warehouses_names)
+
+
+async def prepare_seller(
+    semaphore: asyncio.Semaphore,
+    seller: dict,
+    date: datetime.date,
+    changed_warehouses: list[str],
+):
+    async with semaphore:
+        chunks = None
+        try:
+            async with job_profiler.profile("prepare", seller.get("id")):
+                chunks = await build_info(
+                    seller.get("id"),
+                    seller.get("api_token"),
+                    changed_warehouses,
+                )
+        except WildberriesUnauthorizedError:
+            await disable_seller(seller.get("id"))
+            return
+        except Exception:
+            logger.error(
+                f"Failed to prepare notification for seller "
+                f"{seller.get('id')}",
+                exc_info=True,
+            )
+        query = (
+            "INSERT INTO prepared_notifications "
+            "(seller_id, tariffs_date, chunks, created_at) "
+            "VALUES ($1, $2, $3, $4) "
+            "ON CONFLICT (seller_id, tariffs_date) DO UPDATE SET "
+            "chunks = EXCLUDED.chunks, created_at = EXCLUDED.created_at"
+        )
+        await db.pool.execute(
+            query, seller.get("id"), date, chunks, datetime.datetime.now()
+        )
+
+
+async def prepare_notifications(
+    date: datetime.date, changed_warehouses: list[str]
+):
+    """
+    Расчет уведомлений на дату date сразу после появления тарифов, только
+    для продавцов с остатками на складах, где изменится коэффициент.
+    Вызывается TariffsListener
+    """
+    if date != datetime.date.today() + datetime.timedelta(days=1):
+        return
+    started_at = time.monotonic()
+    prepared_at = datetime.datetime.now()
+    _prepared_dates.pop(date, None)
+    query = "DELETE FROM prepared_notifications WHERE tariffs_date <= $1"
+    await db.pool.execute(query, date)
+    sellers = []
+    if changed_warehouses:
+        sellers = await get_affected_sellers(changed_warehouses)
+        semaphore = asyncio.Semaphore(SLOT_CONCURRENCY)
+        results = await asyncio.gather(
+            *(
+                prepare_seller(semaphore, seller, date, changed_warehouses)
+                for seller in sellers
+            ),
+            return_exceptions=True,
+        )
+        for seller, result in zip(sellers, results):
+            if isinstance(result, Exception):
+                logger.error(
+                    f"Failed to save prepared notification for seller "
+                    f"{seller.get('id')}",
+                    exc_info=result,
+                )
+        if any(isinstance(result, Exception) for result in results):
+            # Продавец без сохраненного уведомления получил бы сообщение
+            # об отсутствии изменений, поэтому слоты считают всех заново
+            logger.warning(f"Notifications for {date} are not prepared")
+            return
+    _prepared_dates[date] = prepared_at
+    logger.info(
+        f"Prepared notifications for {date}: {len(sellers)} sellers in "
+        f"{time.monotonic() - started_at:.1f}s"
+    )
+
+
+async def migrate_seller_jobs():
+    """
+    Перенос времени уведомлений из заданий планировщика, созданных
+    отдельно для каждого продавца, в таблицу sellers
+    """
+    for job in scheduler.get_jobs():
+        if not job.id.isdigit():
+            continue
+        fields = {field.name: str(field) for field in job.trigger.fields}
+        slot = f"{int(fields['hour']):02d}:{int(fields['minute']):02d}"
+        query = "UPDATE sellers SET notification_time = $2 WHERE id = $1"
+        await db.pool.execute(query, int(job.id), slot)
+        scheduler.remove_job(job.id)
+        logger.info(f"Seller {job.id} moved to slot {slot}")
+
+
+def schedule_slots():
+    """
+    Регистрация одного задания планировщика на каждый слот TIME_LIST
+    """
+    for slot in TIME_LIST:
+        slot_time = datetime.datetime.strptime(slot, "%H:%M").time()
+        scheduler.add_job(
+            func=run_slot,
+            args=(slot,),
+            trigger=CronTrigger(
+                hour=slot_time.hour,
+                minute=slot_time.minute,
+                timezone=MOSCOW_TIMEZONE,
+            ),
+            id=f"slot_{slot}",
+            replace_existing=True,
+        )
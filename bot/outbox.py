@@ -0,0 +1,184 @@
+import asyncio
+import datetime
+import logging
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Iterable
+
+from aiogram import Bot
+from aiogram.exceptions import (
+    TelegramBadRequest,
+    TelegramForbiddenError,
+    TelegramRetryAfter,
+)
+
+from database import Database
+from metrics import track
+from rate_limit import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+GLOBAL_RATE = 25
+CHAT_RATE = 1
+WORKERS = 8
+MAX_ATTEMPTS = 5
+RETRY_DELAY = 2
+
+
+@dataclass
+class OutboxMessage:
+    id: int
+    chat_id: int
+    text: str
+    created_at: datetime.datetime = field(
+        default_factory=datetime.datetime.now
+    )
+
+
+class Outbox:
+    """
+    Очередь исходящих сообщений Telegram с ограничением частоты отправки
+    общим и для каждого чата. Сообщения хранятся в бд до отправки, чтобы
+    пережить перезапуск, а сообщения одного чата уходят по порядку
+    """
+
+    def __init__(
+        self,
+        bot: Bot,
+        db: Database,
+        global_rate: float = GLOBAL_RATE,
+        chat_rate: float = CHAT_RATE,
+        workers: int = WORKERS,
+    ):
+        self._bot = bot
+        self._db = db
+        self._global_bucket = TokenBucket(global_rate)
+        self._chat_rate = chat_rate
+        self._workers_count = workers
+        self._chats: dict[int, deque[OutboxMessage]] = {}
+        self._chat_buckets: dict[int, TokenBucket] = {}
+        self._ready: asyncio.Queue[int] = asyncio.Queue()
+        self._workers: list[asyncio.Task] = []
+
+    @property
+    def depth(self) -> int:
+        """
+        Количество сообщений, ожидающих отправки
+        """
+        return sum(len(messages) for messages in self._chats.values())
+
+    @property
+    def lag(self) -> float:
+        """
+        Время ожидания самого старого неотправленного сообщения в секундах
+        """
+        oldest = min(
+            (messages[0].created_at for messages in self._chats.values()),
+            default=None,
+        )
+        if oldest is None:
+            return 0.0
+        return (datetime.datetime.now() - oldest).total_seconds()
+
+    async def start(self):
+        query = (
+            "SELECT id, chat_id, text, created_at FROM outbox_messages "
+            "ORDER BY id"
+        )
+        for row in await self._db.pool.fetch(query):
+            self._enqueue(OutboxMessage(**row))
+        self._workers = [
+            asyncio.create_task(self._worker())
+            for _ in range(self._workers_count)
+        ]
+        logger.info(f"Outbox started, {self.depth} messages pending")
+
+    async def stop(self):
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        logger.info(f"Outbox stopped, {self.depth} messages pending")
+
+    async def send(self, chat_id: int, chunks: Iterable[str]):
+        """
+        Постановка частей сообщения в очередь на отправку
+        """
+        chunks = list(chunks)
+        if not chunks:
+            return
+        created_at = datetime.datetime.now()
+        query = (
+            "INSERT INTO outbox_messages (chat_id, text, created_at) "
+            "SELECT $1, chunk, $3 FROM unnest($2::text[]) "
+            "WITH ORDINALITY AS t(chunk, position) ORDER BY position "
+            "RETURNING id"
+        )
+        rows = await self._db.pool.fetch(query, chat_id, chunks, created_at)
+        ids = sorted(row.get("id") for row in rows)
+        for message_id, chunk in zip(ids, chunks):
+            self._enqueue(
+                OutboxMessage(message_id, chat_id, chunk, created_at)
+            )
+
+    def _enqueue(self, message: OutboxMessage):
+        messages = self._chats.get(message.chat_id)
+        if messages is None:
+            messages = self._chats[message.chat_id] = deque()
+            self._ready.put_nowait(message.chat_id)
+        messages.append(message)
+
+    async def _worker(self):
+        while True:
+            chat_id = await self._ready.get()
+            messages = self._chats[chat_id]
+            message = messages[0]
+            try:
+                await self._deliver(message)
+            except Exception:
+                logger.error(
+                    f"Failed to deliver message {message.id} to {chat_id}",
+                    exc_info=True,
+                )
+            try:
+                query = "DELETE FROM outbox_messages WHERE id = $1"
+                await self._db.pool.execute(query, message.id)
+            except Exception:
+                logger.error(
+                    f"Failed to remove message {message.id} from outbox",
+                    exc_info=True,
+                )
+            messages.popleft()
+            if messages:
+                self._ready.put_nowait(chat_id)
+            else:
+                del self._chats[chat_id]
+                self._chat_buckets.pop(chat_id, None)
+
+    async def _deliver(self, message: OutboxMessage):
+        bucket = self._chat_buckets.setdefault(
+            message.chat_id, TokenBucket(self._chat_rate)
+        )
+        attempt = 0
+        while True:
+            await bucket.acquire()
+            await self._global_bucket.acquire()
+            try:
+                with track("send_message"):
+                    await self._bot.send_message(
+                        message.chat_id, message.text
+                    )
+                return
+            except TelegramRetryAfter as e:
+                logger.warning(
+                    f"Flood control for {message.chat_id}, "
+                    f"retry after {e.retry_after}s"
+                )
+                bucket.pause(e.retry_after)
+            except (TelegramForbiddenError, TelegramBadRequest):
+                raise
+            except Exception:
+                attempt += 1
+                if attempt >= MAX_ATTEMPTS:
+                    raise
+                await asyncio.sleep(RETRY_DELAY * 2 ** (attempt - 1))
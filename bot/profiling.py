@@ -0,0 +1,159 @@
+import datetime
+import logging
+import pathlib
+import random
+import time
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import AsyncIterator
+
+from pyinstrument import Profiler
+
+from config_data.config import ProfilingConfig
+
+logger = logging.getLogger(__name__)
+
+PROFILES_LIST_LIMIT = 20
+
+
+@dataclass
+class AwaitTimes:
+    wb: float = 0
+    wb_requests: int = 0
+    postgres: float = 0
+    postgres_queries: int = 0
+
+
+_await_times: ContextVar[AwaitTimes | None] = ContextVar(
+    "await_times", default=None
+)
+
+
+def record_wb_request(seconds: float, requests: int = 1):
+    """
+    Учет времени ожидания API Wildberries в профилируемой задаче. Чтение
+    тела потокового ответа учитывается с requests=0
+    """
+    await_times = _await_times.get()
+    if await_times is not None:
+        await_times.wb += seconds
+        await_times.wb_requests += requests
+
+
+def record_postgres_query(query):
+    """
+    Логгер запросов asyncpg: учет времени запросов к Postgres в
+    профилируемой задаче
+    """
+    await_times = _await_times.get()
+    if await_times is not None:
+        await_times.postgres += query.elapsed
+        await_times.postgres_queries += 1
+
+
+class JobProfiler:
+    """
+    Профилирование расчетов продавцов по запросу: для выбранных продавцов,
+    слотов или случайной доли задач. Одновременно профилируется только одна
+    задача, остальные выполняются без профилировщика
+    """
+
+    def __init__(self, config: ProfilingConfig):
+        self._config = config
+        self._directory = pathlib.Path(config.directory)
+        self._active = False
+
+    def should_profile(self, seller_id: int, slot: str | None) -> bool:
+        return (
+            seller_id in self._config.sellers
+            or (slot is not None and slot in self._config.slots)
+            or random.random() < self._config.sample_rate
+        )
+
+    @asynccontextmanager
+    async def profile(
+        self, job: str, seller_id: int, slot: str | None = None
+    ) -> AsyncIterator[None]:
+        if self._active or not self.should_profile(seller_id, slot):
+            yield
+            return
+        self._active = True
+        await_times = AwaitTimes()
+        token = _await_times.set(await_times)
+        profiler = Profiler(async_mode="enabled")
+        started_at = datetime.datetime.now()
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        profiler.start()
+        try:
+            yield
+        finally:
+            profiler.stop()
+            wall = time.perf_counter() - wall_start
+            cpu = time.process_time() - cpu_start
+            _await_times.reset(token)
+            self._active = False
+            try:
+                self._save(
+                    job,
+                    seller_id,
+                    slot,
+                    started_at,
+                    wall,
+                    cpu,
+                    await_times,
+                    profiler,
+                )
+            except Exception:
+                logger.error("Failed to save profile", exc_info=True)
+
+    def _save(
+        self,
+        job: str,
+        seller_id: int,
+        slot: str | None,
+        started_at: datetime.datetime,
+        wall: float,
+        cpu: float,
+        await_times: AwaitTimes,
+        profiler: Profiler,
+    ):
+        self._directory.mkdir(parents=True, exist_ok=True)
+        name = f"{started_at:%Y%m%d-%H%M%S}-{job}-{seller_id}.txt"
+        summary = (
+            f"Job: {job}, seller: {seller_id}, slot: {slot or '-'}\n"
+            f"Started: {started_at:%Y-%m-%d %H:%M:%S}\n"
+            f"Wall: {wall:.3f}s\n"
+            f"CPU (process): {cpu:.3f}s\n"
+            f"WB API: {await_times.wb:.3f}s in "
+            f"{await_times.wb_requests} requests\n"
+            f"Postgres: {await_times.postgres:.3f}s in "
+            f"{await_times.postgres_queries} queries\n\n"
+        )
+        report = profiler.output_text(unicode=True, color=False)
+        (self._directory / name).write_text(
+            summary + report, encoding="utf-8"
+        )
+        logger.info(f"Profile of {job} for seller {seller_id} saved: {name}")
+
+    def list_profiles(
+        self, limit: int = PROFILES_LIST_LIMIT
+    ) -> list[pathlib.Path]:
+        """
+        Последние сохраненные профили, от новых к старым
+        """
+        if not self._directory.exists():
+            return []
+        profiles = sorted(
+            self._directory.glob("*.txt"),
+            key=lambda path: path.stat().st_mtime,
+            reverse=True,
+        )
+        return profiles[:limit]
+
+    def get_profile(self, name: str) -> pathlib.Path | None:
+        path = self._directory / pathlib.Path(name).name
+        if path.suffix != ".txt" or not path.is_file():
+            return None
+        return path
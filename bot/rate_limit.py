@@ -0,0 +1,66 @@
+import asyncio
+import time
+
+
+class TokenBucket:
+    """
+    Ограничитель частоты: rate токенов в секунду, не больше capacity
+    накопленных токенов
+    """
+
+    def __init__(self, rate: float, capacity: float | None = None):
+        self._rate = rate
+        self._capacity = max(capacity or rate, 1)
+        self._tokens = self._capacity
+        self._updated_at = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def _refill(self, now: float):
+        self._tokens = min(
+            self._capacity,
+            self._tokens + (now - self._updated_at) * self._rate,
+        )
+        self._updated_at = now
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    await asyncio.sleep(self._paused_until - now)
+                    continue
+                self._refill(now)
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self._rate)
+
+    def wait_time(self, delay: float = 0) -> float:
+        """
+        Оценка ожидания токена, если запросить его через delay секунд,
+        без учета других ожидающих
+        """
+        now = time.monotonic() + delay
+        paused = max(self._paused_until - now, 0)
+        tokens = min(
+            self._capacity,
+            self._tokens + (now + paused - self._updated_at) * self._rate,
+        )
+        return paused + max(1 - tokens, 0) / self._rate
+
+    def pause(self, seconds: float, refund: bool = False):
+        """
+        Запрет выдачи токенов на seconds секунд после ответа сервера о
+        превышении лимита. Если сервер сам указал задержку, refund=True
+        возвращает токен отклоненного запроса, и после паузы запрос
+        уходит сразу. Иначе накопленные токены сгорают, и следующий
+        запрос ждет полного периода пополнения, для STATISTICS около минуты
+        """
+        now = time.monotonic()
+        self._refill(now)
+        self._paused_until = max(self._paused_until, now + seconds)
+        if refund:
+            self._tokens = min(self._capacity, self._tokens + 1)
+        else:
+            self._tokens = 0
@@ -0,0 +1,53 @@
+import datetime
+from dataclasses import dataclass, field
+from typing import NamedTuple
+
+
+class StockRow(NamedTuple):
+    """
+    Строка таблицы stocks в порядке колонок, готовая для COPY
+    """
+
+    seller_id: int
+    product_id: int
+    last_change_date: datetime.datetime | None
+    warehouse_name: str | None
+    supplier_article: str | None
+    barcode: str | None
+    quantity: int | None
+    in_way_to_client: int | None
+    in_way_from_client: int | None
+    quantity_full: int | None
+    category: str | None
+    subject: str | None
+    brand: str | None
+    tech_size: str | None
+    price: float | None
+    discount: float | None
+    is_supply: bool | None
+    is_realization: bool | None
+    sc_code: str | None
+
+
+@dataclass(slots=True)
+class RelevantProduct:
+    """
+    Товар, затронутый изменением тарифов, и склады с его остатками
+    """
+
+    nm_id: int
+    vendor_code: str | None
+    title: str | None
+    length: float | None
+    width: float | None
+    height: float | None
+    warehouses: list[str] = field(default_factory=list)
+
+    @property
+    def volume(self) -> float:
+        """
+        Объем в литрах по габаритам в сантиметрах
+        """
+        return (
+            (self.length or 0) * (self.width or 0) * (self.height or 0) / 1000
+        )
@@ -0,0 +1,139 @@
+import asyncio
+import datetime
+import functools
+import logging
+from typing import Awaitable, Callable
+
+from asyncpg import Connection
+
+from database import Database
+from tariffs_store import TariffsStore
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "wb_tariffs_updated"
+DEBOUNCE_DELAY = 30
+RECONNECT_DELAY = 10
+
+
+class TariffsListener:
+    """
+    Подписка на уведомления бд тарифов о новых тарифах. После затишья в
+    DEBOUNCE_DELAY секунд кэш тарифов на затронутые даты сбрасывается, а
+    on_change вызывается один раз на дату со списком складов, у которых
+    изменится коэффициент. На каждую дату выполняется не больше одной
+    обработки: незавершенная предыдущая отменяется перед запуском новой
+    """
+
+    def __init__(
+        self,
+        wb_tariffs_db: Database,
+        tariffs_store: TariffsStore,
+        on_change: Callable[[datetime.date, list[str]], Awaitable[None]],
+        debounce_delay: float = DEBOUNCE_DELAY,
+    ):
+        self._wb_tariffs_db = wb_tariffs_db
+        self._tariffs_store = tariffs_store
+        self._on_change = on_change
+        self._debounce_delay = debounce_delay
+        self._connection: Connection | None = None
+        self._pending: dict[datetime.date, asyncio.TimerHandle] = {}
+        self._running: dict[datetime.date, asyncio.Task] = {}
+        self._tasks: set[asyncio.Task] = set()
+
+    async def start(self):
+        try:
+            self._connection = await self._wb_tariffs_db.pool.acquire()
+            await self._connection.add_listener(CHANNEL, self._notify)
+            self._connection.add_termination_listener(self._terminated)
+            logger.info(f"Listening to {CHANNEL}")
+        except Exception:
+            logger.error(f"Failed to listen to {CHANNEL}", exc_info=True)
+            self._spawn(self._restart)
+
+    async def stop(self):
+        for handle in self._pending.values():
+            handle.cancel()
+        self._pending.clear()
+        tasks = list(self._tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if self._connection is not None:
+            self._connection.remove_termination_listener(self._terminated)
+            await self._connection.remove_listener(CHANNEL, self._notify)
+        await self._release()
+
+    async def _release(self):
+        if self._connection is not None:
+            await self._wb_tariffs_db.pool.release(self._connection)
+            self._connection = None
+
+    def _terminated(self, connection: Connection):
+        logger.warning(f"Connection listening to {CHANNEL} was closed")
+        self._spawn(self._restart)
+
+    async def _restart(self):
+        await self._release()
+        await asyncio.sleep(RECONNECT_DELAY)
+        await self.start()
+
+    def _spawn(
+        self, func: Callable[..., Awaitable], *args
+    ) -> asyncio.Task:
+        task = asyncio.ensure_future(func(*args))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    def _spawn_handle(self, date: datetime.date):
+        self._pending.pop(date, None)
+        previous = self._running.get(date)
+        task = self._running[date] = self._spawn(
+            self._handle, date, previous
+        )
+        task.add_done_callback(functools.partial(self._handled, date))
+
+    def _handled(self, date: datetime.date, task: asyncio.Task):
+        if self._running.get(date) is task:
+            del self._running[date]
+
+    def _notify(
+        self, connection: Connection, pid: int, channel: str, payload: str
+    ):
+        dates = set()
+        for value in (payload or "").split(","):
+            try:
+                dates.add(datetime.date.fromisoformat(value.strip()))
+            except ValueError:
+                continue
+        if not dates:
+            dates.add(datetime.date.today() + datetime.timedelta(days=1))
+        loop = asyncio.get_running_loop()
+        for date in dates:
+            handle = self._pending.pop(date, None)
+            if handle is not None:
+                handle.cancel()
+            self._pending[date] = loop.call_later(
+                self._debounce_delay, self._spawn_handle, date
+            )
+
+    async def _handle(
+        self, date: datetime.date, previous: asyncio.Task | None = None
+    ):
+        if previous is not None and not previous.done():
+            logger.info(f"Restarting handling of tariffs update for {date}")
+            previous.cancel()
+            await asyncio.gather(previous, return_exceptions=True)
+        self._tariffs_store.invalidate(date)
+        try:
+            tariffs = await self._tariffs_store.get(date)
+            logger.info(
+                f"Tariffs for {date} updated, "
+                f"{len(tariffs.changed_warehouses)} warehouses changed"
+            )
+            await self._on_change(date, tariffs.changed_warehouses)
+        except Exception:
+            logger.error(
+                f"Failed to handle tariffs update for {date}", exc_info=True
+            )
@@ -0,0 +1,123 @@
+import asyncio
+import datetime
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+from asyncpg import Record
+
+from database import Database
+from metrics import timed
+
+logger = logging.getLogger(__name__)
+
+TARIFFS_TTL = 600
+TARIFFS_MAX_DATES = 8
+TARIFFS_QUERY = "SELECT * FROM wb_warehouses_tariffs WHERE date = $1"
+FINGERPRINT_QUERY = (
+    "SELECT md5(string_agg(t::text, ',' ORDER BY t::text)) "
+    "FROM wb_warehouses_tariffs t WHERE date = $1"
+)
+
+
+@dataclass
+class TariffsSnapshot:
+    tariffs: list[Record]
+    fingerprint: str | None
+    loaded_at: float = field(default_factory=time.monotonic)
+    by_warehouse: dict[str, Record] = field(init=False)
+    changed_warehouses: list[str] = field(init=False)
+
+    def __post_init__(self):
+        self.by_warehouse = {
+            tariff.get("warehouse_name"): tariff for tariff in self.tariffs
+        }
+        self.changed_warehouses = [
+            tariff.get("warehouse_name")
+            for tariff in self.tariffs
+            if tariff.get("box_delivery_and_storage_diff_sign")
+        ]
+
+
+class TariffsStore:
+    """
+    Общий для всех продавцов кэш тарифов складов по датам
+    """
+
+    def __init__(
+        self,
+        wb_tariffs_db: Database,
+        ttl: float = TARIFFS_TTL,
+        max_dates: int = TARIFFS_MAX_DATES,
+    ):
+        self._wb_tariffs_db = wb_tariffs_db
+        self._ttl = ttl
+        self._max_dates = max_dates
+        self._snapshots: OrderedDict[datetime.date, TariffsSnapshot] = (
+            OrderedDict()
+        )
+        self._locks: dict[datetime.date, asyncio.Lock] = {}
+
+    @timed("get_tariffs")
+    async def get(self, date: datetime.date) -> TariffsSnapshot:
+        """
+        Получение тарифов на дату. Одновременные запросы на одну дату
+        ожидают одну загрузку из бд
+        """
+        snapshot = self._snapshots.get(date)
+        if snapshot and not self._is_stale(snapshot):
+            self._snapshots.move_to_end(date)
+            return snapshot
+        lock = self._locks.setdefault(date, asyncio.Lock())
+        async with lock:
+            snapshot = self._snapshots.get(date)
+            if snapshot and self._is_stale(snapshot):
+                snapshot = await self._revalidate(date, snapshot)
+            if snapshot is None:
+                snapshot = await self._load(date)
+            self._snapshots[date] = snapshot
+            self._snapshots.move_to_end(date)
+            while len(self._snapshots) > self._max_dates:
+                evicted, _ = self._snapshots.popitem(last=False)
+                self._locks.pop(evicted, None)
+        return snapshot
+
+    def invalidate(self, date: datetime.date | None = None):
+        """
+        Сброс кэша на дату или целиком
+        """
+        if date is None:
+            self._snapshots.clear()
+        else:
+            self._snapshots.pop(date, None)
+
+    def _is_stale(self, snapshot: TariffsSnapshot) -> bool:
+        return time.monotonic() - snapshot.loaded_at > self._ttl
+
+    async def _load(self, date: datetime.date) -> TariffsSnapshot:
+        async with self._wb_tariffs_db.pool.acquire() as connection:
+            async with connection.transaction(
+                isolation="repeatable_read", readonly=True
+            ):
+                tariffs = await connection.fetch(TARIFFS_QUERY, date)
+                fingerprint = await connection.fetchval(
+                    FINGERPRINT_QUERY, date
+                )
+        logger.info(f"Loaded {len(tariffs)} tariffs for {date}")
+        return TariffsSnapshot(tariffs, fingerprint)
+
+    async def _revalidate(
+        self, date: datetime.date, snapshot: TariffsSnapshot
+    ) -> TariffsSnapshot | None:
+        """
+        Проверка, изменились ли тарифы в бд с момента загрузки
+        """
+        fingerprint = await self._wb_tariffs_db.pool.fetchval(
+            FINGERPRINT_QUERY, date
+        )
+        if fingerprint != snapshot.fingerprint:
+            logger.info(f"Tariffs for {date} changed, reloading")
+            return None
+        snapshot.loaded_at = time.monotonic()
+        return snapshot
@@ -0,0 +1,125 @@
+import datetime
+import logging
+from typing import Callable, Iterable
+
+logger = logging.getLogger(__name__)
+
+Converter = Callable[[str], datetime.datetime]
+
+
+def parse_seconds(value: str) -> datetime.datetime:
+    """
+    2023-01-01T10:00:00
+    """
+    if len(value) != 19 or value[10] != "T":
+        raise ValueError(value)
+    return datetime.datetime.fromisoformat(value)
+
+
+def parse_seconds_z(value: str) -> datetime.datetime:
+    """
+    2023-01-01T10:00:00Z
+    """
+    if len(value) != 20 or value[19] != "Z" or value[10] != "T":
+        raise ValueError(value)
+    return datetime.datetime.fromisoformat(value[:19])
+
+
+def parse_fraction_z(value: str) -> datetime.datetime:
+    """
+    2023-01-01T10:00:00.123Z, от 1 до 6 знаков дробной части
+    """
+    fraction = value[20:-1]
+    if (
+        value[-1:] != "Z"
+        or value[19:20] != "."
+        or value[10:11] != "T"
+        or not 0 < len(fraction) <= 6
+        or not fraction.isdigit()
+    ):
+        raise ValueError(value)
+    if len(fraction) in (3, 6):
+        return datetime.datetime.fromisoformat(value[:-1])
+    return datetime.datetime.fromisoformat(
+        value[:20] + fraction.ljust(6, "0")
+    )
+
+
+def detect_converter(value: str) -> Converter | None:
+    """
+    Выбор разбора по виду строки за один проход, без перебора форматов
+    """
+    length = len(value)
+    if length == 19:
+        return parse_seconds
+    if length == 20 and value[19] == "Z":
+        return parse_seconds_z
+    if length > 21 and value[19] == "." and value[-1] == "Z":
+        return parse_fraction_z
+    return None
+
+
+class TimestampParser:
+    """
+    Разбор дат ISO 8601 из ответов Wildberries: 2023-01-01T10:00:00,
+    с суффиксом Z и с дробной частью секунд и Z. Результат - datetime без
+    часового пояса, как у прежнего перебора форматов через strptime.
+    Найденный формат запоминается для каждого поля, следующие значения
+    поля разбираются сразу им, а при несовпадении формат определяется
+    заново
+    """
+
+    def __init__(self):
+        self._converters: dict[str, Converter] = {}
+
+    def _detect(self, field: str, value: str) -> datetime.datetime | None:
+        converter = detect_converter(value)
+        if converter is not None:
+            try:
+                result = converter(value)
+            except ValueError:
+                pass
+            else:
+                self._converters[field] = converter
+                return result
+        logger.error(f"Failed to convert '{value}' to date")
+        return None
+
+    def parse(self, field: str, value: str | None) -> datetime.datetime | None:
+        if not isinstance(value, str):
+            return None
+        converter = self._converters.get(field)
+        if converter is not None:
+            try:
+                return converter(value)
+            except ValueError:
+                pass
+        return self._detect(field, value)
+
+    def parse_column(
+        self, field: str, values: Iterable[str | None]
+    ) -> list[datetime.datetime | None]:
+        """
+        Разбор всех значений поля одним форматом. Если в колонке
+        встретилось значение другого вида или пустое, колонка
+        разбирается поштучно
+        """
+        values = list(values)
+        converter = self._converters.get(field)
+        if converter is None:
+            first = next(
+                (value for value in values if isinstance(value, str)), None
+            )
+            if first is None:
+                return [None] * len(values)
+            self.parse(field, first)
+            converter = self._converters.get(field)
+        if converter is not None:
+            try:
+                return [converter(value) for value in values]
+            except (ValueError, TypeError):
+                pass
+        return [self.parse(field, value) for value in values]
+
+
+wb_timestamps = TimestampParser()
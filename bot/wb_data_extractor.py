@@ -1,12 +1,68 @@
+import asyncio
+import datetime
+import hashlib
 import json
 import logging
+from dataclasses import dataclass
+from typing import AsyncIterable, AsyncIterator
+
+from asyncpg import Connection, Record
 
 from database import Database
-from wb_parser import WBParser
-from utils import str_to_date
+from metrics import ROWS_WRITTEN, timed
+from records import StockRow
+from timestamps import wb_timestamps
+from wb_parser import (
+    WBParser,
+    WildberriesRateLimitError,
+    WildberriesUnauthorizedError,
+)
 
 logger = logging.getLogger(__name__)
 
+CONTENT_HASH_SIZE = 16
+
+PRODUCT_UPDATE_FIELDS = (
+    "imt_id",
+    "nm_uuid",
+    "subject_id",
+    "subject_name",
+    "vendor_code",
+    "brand",
+    "title",
+    "description",
+    "video",
+    "photos",
+    "length",
+    "width",
+    "height",
+    "characteristics",
+    "sizes",
+    "tags",
+    "created_at",
+    "updated_at",
+    "content_hash",
+)
+STOCK_COLUMNS = list(StockRow._fields)
+STOCKS_BATCH_SIZE = 5000
+
+
+@dataclass
+class StocksStats:
+    rows: int = 0
+    unmatched: int = 0
+
+
+def card_fingerprint(product: dict) -> bytes:
+    """
+    Отпечаток содержимого карточки из ответа API. Порядок ключей в ответе
+    постоянный, поэтому repr без сериализации в JSON дает одинаковый
+    результат для одинаковых карточек
+    """
+    return hashlib.blake2b(
+        repr(product).encode(), digest_size=CONTENT_HASH_SIZE
+    ).digest()
+
 
 class WBDataExtractor:
     def __init__(self, wb_parser: WBParser, db: Database, seller_id: int):
@@ -18,87 +74,378 @@ class WBDataExtractor:
     Класс для извлечения данных с API Wildberries
     """
 
-    async def get_products_info_data(self) -> list[dict]:
+    async def get_products_info_data(self) -> list[Record]:
         """
         Получение данных о товарах из бд
         """
         query = "SELECT id, nm_id FROM products WHERE seller_id = $1"
         return await self._db.pool.fetch(query, self._seller_id)
 
-    async def insert_products(self):
-        """
-        Извлечение данных о товарах и вставка в бд
-        """
-        products_data = await self._wb_parser.get_products()
-        products_list = []
-        for product in products_data:
-            product_data = {
-                "seller_id": self._seller_id,
-                "nm_id": product.get("nmID"),
-                "imt_id": product.get("imtID"),
-                "nm_uuid": product.get("nmUUID"),
-                "subject_id": product.get("subjectID"),
-                "subject_name": product.get("subjectName"),
-                "vendor_code": product.get("vendorCode"),
-                "brand": product.get("brand"),
-                "title": product.get("title"),
-                "description": product.get("description"),
-                "video": product.get("video"),
-                "photos": json.dumps(
-                    product.get("photos"), ensure_ascii=False
-                ),
-                "length": product.get("dimensions").get("length"),
-                "width": product.get("dimensions").get("width"),
-                "height": product.get("dimensions").get("height"),
-                "characteristics": json.dumps(
-                    product.get("characteristics"), ensure_ascii=False
-                ),
-                "sizes": json.dumps(product.get("sizes"), ensure_ascii=False),
-                "tags": json.dumps(product.get("tags"), ensure_ascii=False),
-                "created_at": str_to_date(product.get("createdAt")),
-                "updated_at": str_to_date(product.get("updatedAt")),
-            }
-            products_list.append(product_data)
-        await self._db.insert_data("products", products_list)
-
-    async def extract_warehouses_stocks(self):
-        """
-        Извлечение данных о товарах и вставка в бд
+    async def get_products_hashes(self) -> dict[int, bytes]:
         """
-        products_info_data = await self.get_products_info_data()
-        stocks_data = await self._wb_parser.get_warehouses_stocks()
-        stocks_list = []
-        for stock in stocks_data:
-            product_id = next(
-                (
-                    row.get("id")
-                    for row in products_info_data
-                    if stock.get("nmId") == row.get("nm_id")
-                ),
-                None,
+        Отпечатки содержимого карточек, уже записанных в бд, по nm_id.
+        Для карточек, записанных до появления отпечатков, None
+        """
+        query = "SELECT nm_id, content_hash FROM products WHERE seller_id = $1"
+        rows = await self._db.pool.fetch(query, self._seller_id)
+        return {nm_id: content_hash for nm_id, content_hash in rows}
+
+    def product_row(
+        self,
+        product: dict,
+        updated_at: datetime.datetime | None,
+        content_hash: bytes,
+    ) -> dict:
+        """
+        Преобразование карточки товара в строку таблицы products. Дата
+        updatedAt передается уже разобранной вместе со страницей
+        """
+        dimensions = product.get("dimensions") or {}
+        return {
+            "seller_id": self._seller_id,
+            "nm_id": product.get("nmID"),
+            "imt_id": product.get("imtID"),
+            "nm_uuid": product.get("nmUUID"),
+            "subject_id": product.get("subjectID"),
+            "subject_name": product.get("subjectName"),
+            "vendor_code": product.get("vendorCode"),
+            "brand": product.get("brand"),
+            "title": product.get("title"),
+            "description": product.get("description"),
+            "video": product.get("video"),
+            "photos": json.dumps(product.get("photos"), ensure_ascii=False),
+            "length": dimensions.get("length"),
+            "width": dimensions.get("width"),
+            "height": dimensions.get("height"),
+            "characteristics": json.dumps(
+                product.get("characteristics"), ensure_ascii=False
+            ),
+            "sizes": json.dumps(product.get("sizes"), ensure_ascii=False),
+            "tags": json.dumps(product.get("tags"), ensure_ascii=False),
+            "created_at": wb_timestamps.parse(
+                "createdAt", product.get("createdAt")
+            ),
+            "updated_at": updated_at,
+            "content_hash": content_hash,
+        }
+
+    async def get_products_sync_state(self) -> Record:
+        """
+        Получение отметок последней синхронизации товаров продавца
+        """
+        query = (
+            "SELECT products_synced_at, products_reconciled_at "
+            "FROM sellers WHERE id = $1"
+        )
+        return await self._db.pool.fetchrow(query, self._seller_id)
+
+    @timed("get_products")
+    async def insert_products(self, full: bool = False):
+        """
+        Извлечение данных о товарах и вставка в бд. Загружаются только
+        карточки, измененные после прошлой синхронизации, либо все, если
+        full=True или синхронизации еще не было. Каждая страница
+        записывается, пока загружается следующая. Карточки, отпечаток
+        которых совпадает с записанным, не сериализуются и не пишутся.
+        Если появились новые карточки, а в остатках были строки без
+        товара, отметка синхронизации остатков сбрасывается, чтобы эти
+        строки загрузились заново. Отказ в доступе и исчерпанный лимит
+        запросов передаются вызывающему, остальные ошибки пишутся в лог
+        """
+        sync_state = await self.get_products_sync_state()
+        products_hashes = await self.get_products_hashes()
+        updated_since = None
+        if not full and sync_state:
+            updated_since = sync_state.get("products_synced_at")
+        synced_at = updated_since
+        new_products = False
+        pending_insert = None
+        try:
+            pages = self._wb_parser.iter_products(updated_since)
+            async for products_page, updated_at in pages:
+                products_list = []
+                for product, product_updated_at in zip(
+                    products_page, updated_at
+                ):
+                    if product_updated_at and (
+                        synced_at is None or product_updated_at > synced_at
+                    ):
+                        synced_at = product_updated_at
+                    content_hash = card_fingerprint(product)
+                    nm_id = product.get("nmID")
+                    if nm_id not in products_hashes:
+                        new_products = True
+                    if products_hashes.get(nm_id) != content_hash:
+                        products_list.append(
+                            self.product_row(
+                                product, product_updated_at, content_hash
+                            )
+                        )
+                if not products_list:
+                    continue
+                if pending_insert:
+                    await pending_insert
+                pending_insert = asyncio.create_task(
+                    self._db.insert_data(
+                        "products",
+                        products_list,
+                        conflict_target="seller_id, nm_id",
+                        update_fields=PRODUCT_UPDATE_FIELDS,
+                    )
+                )
+            if pending_insert:
+                await pending_insert
+        except (WildberriesUnauthorizedError, WildberriesRateLimitError):
+            raise
+        except Exception:
+            logger.error(
+                f"Seller {self._seller_id}: products sync failed",
+                exc_info=True,
             )
+            return
+        finally:
+            if pending_insert and not pending_insert.done():
+                pending_insert.cancel()
+        query = (
+            "UPDATE sellers SET products_synced_at = $2, "
+            "products_reconciled_at = CASE WHEN $3 THEN $4 "
+            "ELSE products_reconciled_at END, "
+            "stocks_synced_at = CASE WHEN $5 AND stocks_unmatched THEN NULL "
+            "ELSE stocks_synced_at END, "
+            "stocks_unmatched = stocks_unmatched AND NOT $5 WHERE id = $1"
+        )
+        await self._db.pool.execute(
+            query,
+            self._seller_id,
+            synced_at,
+            updated_since is None,
+            datetime.datetime.now(),
+            new_products,
+        )
+
+    async def get_products_index(self) -> dict[int, int]:
+        """
+        Построение индекса nm_id -> product_id для сопоставления остатков
+        """
+        products_info_data = await self.get_products_info_data()
+        return {nm_id: product_id for product_id, nm_id in products_info_data}
+
+    def stock_row(self, stock: dict, product_id: int) -> StockRow:
+        """
+        Преобразование строки остатков API в строку таблицы stocks
+        """
+        get = stock.get
+        return StockRow(
+            self._seller_id,
+            product_id,
+            wb_timestamps.parse("lastChangeDate", get("lastChangeDate")),
+            get("warehouseName"),
+            get("supplierArticle"),
+            get("barcode"),
+            get("quantity"),
+            get("inWayToClient"),
+            get("inWayFromClient"),
+            get("quantityFull"),
+            get("category"),
+            get("subject"),
+            get("brand"),
+            get("techSize"),
+            get("Price"),
+            get("Discount"),
+            get("isSupply"),
+            get("isRealization"),
+            get("SCCode"),
+        )
+
+    async def iter_stock_batches(
+        self,
+        stocks: AsyncIterable[dict],
+        products_index: dict[int, int],
+        stats: StocksStats,
+        batch_size: int = STOCKS_BATCH_SIZE,
+    ) -> AsyncIterator[list[StockRow]]:
+        """
+        Сопоставление потока остатков с товарами и выдача строк таблицы
+        stocks пачками по batch_size. Счетчики строк пишутся в stats
+        """
+        batch = []
+        async for stock in stocks:
+            stats.rows += 1
+            product_id = products_index.get(stock.get("nmId"))
             if not product_id:
+                stats.unmatched += 1
                 continue
-            stock_data = {
-                "seller_id": self._seller_id,
-                "product_id": product_id,
-                "last_change_date": str_to_date(stock.get("lastChangeDate")),
-                "warehouse_name": stock.get("warehouseName"),
-                "supplier_article": stock.get("supplierArticle"),
-                "barcode": stock.get("barcode"),
-                "quantity": stock.get("quantity"),
-                "in_way_to_client": stock.get("inWayToClient"),
-                "in_way_from_client": stock.get("inWayFromClient"),
-                "quantity_full": stock.get("quantityFull"),
-                "category": stock.get("category"),
-                "subject": stock.get("subject"),
-                "brand": stock.get("brand"),
-                "tech_size": stock.get("techSize"),
-                "price": stock.get("Price"),
-                "discount": stock.get("Discount"),
-                "is_supply": stock.get("isSupply"),
-                "is_realization": stock.get("isRealization"),
-                "sc_code": stock.get("SCCode"),
-            }
-            stocks_list.append(stock_data)
-        return stocks_list
+            batch.append(self.stock_row(stock, product_id))
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    async def get_stocks_watermark(self) -> datetime.datetime | None:
+        """
+        Получение даты последнего изменения остатков, уже записанных в бд
+        """
+        query = "SELECT stocks_synced_at FROM sellers WHERE id = $1"
+        return await self._db.pool.fetchval(query, self._seller_id)
+
+    async def save_stocks(
+        self,
+        stocks: list[StockRow] | AsyncIterable[list[StockRow]],
+        stats: StocksStats | None = None,
+    ) -> int:
+        """
+        Обновление текущих остатков продавца и запись в историю только
+        реально изменившихся строк. Остатки передаются списком или потоком
+        пачек. Отметка синхронизации сдвигается в той же транзакции, там
+        же отмечаются время синхронизации и были ли строки без товара по
+        счетчикам stats.
+        Возвращает количество изменений
+        """
+        async with self._db.staging("stocks", stocks, STOCK_COLUMNS) as (
+            connection,
+            staging_table,
+            keys,
+        ):
+            columns = ", ".join(keys)
+            staged_columns = ", ".join(f"s.{key}" for key in keys)
+            status = await connection.execute(
+                f"""
+                WITH changed AS (
+                    INSERT INTO current_stocks AS cs (
+                        seller_id, product_id, warehouse_name, tech_size,
+                        barcode, quantity, in_way_to_client,
+                        in_way_from_client, quantity_full, last_change_date
+                    )
+                    SELECT DISTINCT ON (
+                        product_id, warehouse_name, COALESCE(tech_size, '')
+                    )
+                        seller_id, product_id, warehouse_name,
+                        COALESCE(tech_size, ''), barcode, quantity,
+                        in_way_to_client, in_way_from_client, quantity_full,
+                        last_change_date
+                    FROM {staging_table}
+                    WHERE warehouse_name IS NOT NULL
+                    ORDER BY product_id, warehouse_name,
+                        COALESCE(tech_size, ''), last_change_date DESC
+                    ON CONFLICT (
+                        seller_id, product_id, warehouse_name, tech_size
+                    ) DO UPDATE SET
+                        barcode = EXCLUDED.barcode,
+                        quantity = EXCLUDED.quantity,
+                        in_way_to_client = EXCLUDED.in_way_to_client,
+                        in_way_from_client = EXCLUDED.in_way_from_client,
+                        quantity_full = EXCLUDED.quantity_full,
+                        last_change_date = EXCLUDED.last_change_date
+                    WHERE (
+                        cs.quantity, cs.in_way_to_client,
+                        cs.in_way_from_client, cs.quantity_full
+                    ) IS DISTINCT FROM (
+                        EXCLUDED.quantity, EXCLUDED.in_way_to_client,
+                        EXCLUDED.in_way_from_client, EXCLUDED.quantity_full
+                    )
+                    RETURNING
+                        cs.product_id, cs.warehouse_name, cs.tech_size,
+                        cs.last_change_date
+                )
+                INSERT INTO stocks ({columns})
+                SELECT {staged_columns}
+                FROM {staging_table} s
+                JOIN changed c
+                    ON c.product_id = s.product_id
+                    AND c.warehouse_name = s.warehouse_name
+                    AND c.tech_size = COALESCE(s.tech_size, '')
+                    AND c.last_change_date IS NOT DISTINCT FROM
+                        s.last_change_date
+                ON CONFLICT DO NOTHING
+                """
+            )
+            await self.update_warehouse_index(connection, staging_table)
+            changed = int(status.split()[-1])
+            ROWS_WRITTEN.labels("stocks").inc(changed)
+            await connection.execute(
+                "UPDATE sellers SET stocks_synced_at = GREATEST("
+                f"stocks_synced_at, (SELECT max(last_change_date) "
+                f"FROM {staging_table})), "
+                "stocks_unmatched = stocks_unmatched OR $2, "
+                "stocks_checked_at = $3 WHERE id = $1",
+                self._seller_id,
+                stats is not None and stats.unmatched > 0,
+                datetime.datetime.now(),
+            )
+        return changed
+
+    async def update_warehouse_index(
+        self, connection: Connection, staging_table: str
+    ):
+        """
+        Обновление индекса склад -> (продавец, товар) для пар товар-склад,
+        затронутых загруженными остатками. Проверка наличия при удалении
+        идет напрямую по уникальному индексу current_stocks, а не по CTE,
+        чтобы при устаревшей статистике не получить квадратичный план
+        """
+        await connection.execute(
+            f"""
+            WITH touched AS (
+                SELECT DISTINCT product_id, warehouse_name
+                FROM {staging_table}
+                WHERE warehouse_name IS NOT NULL
+            ),
+            in_stock AS (
+                SELECT DISTINCT cs.product_id, cs.warehouse_name
+                FROM current_stocks cs
+                JOIN touched t
+                    ON t.product_id = cs.product_id
+                    AND t.warehouse_name = cs.warehouse_name
+                WHERE cs.seller_id = $1 AND cs.quantity > 0
+            ),
+            removed AS (
+                DELETE FROM warehouse_stock_index i
+                USING touched t
+                WHERE i.seller_id = $1
+                    AND i.product_id = t.product_id
+                    AND i.warehouse_name = t.warehouse_name
+                    AND NOT EXISTS (
+                        SELECT 1 FROM current_stocks cs
+                        WHERE cs.seller_id = $1
+                            AND cs.product_id = i.product_id
+                            AND cs.warehouse_name = i.warehouse_name
+                            AND cs.quantity > 0
+                    )
+            )
+            INSERT INTO warehouse_stock_index
+                (warehouse_name, seller_id, product_id)
+            SELECT warehouse_name, $1, product_id FROM in_stock
+            ON CONFLICT DO NOTHING
+            """,
+            self._seller_id,
+        )
+
+    @timed("get_warehouses_stocks")
+    async def extract_warehouses_stocks(self) -> int:
+        """
+        Извлечение данных об остатках, измененных после прошлой
+        синхронизации, сопоставление их с товарами и запись в бд по мере
+        чтения ответа. Соединение с бд берется только после успешного
+        ответа API, чтобы не держать его на время ожидания лимитов и
+        повторов. Возвращает количество изменившихся остатков
+        """
+        products_index = await self.get_products_index()
+        watermark = await self.get_stocks_watermark()
+        if watermark:
+            response = self._wb_parser.open_warehouses_stocks(
+                watermark.strftime("%Y-%m-%dT%H:%M:%S")
+            )
+        else:
+            response = self._wb_parser.open_warehouses_stocks()
+        stats = StocksStats()
+        async with response as stocks:
+            changed = await self.save_stocks(
+                self.iter_stock_batches(stocks, products_index, stats), stats
+            )
+        if stats.unmatched:
+            logger.warning(
+                f"Seller {self._seller_id}: {stats.unmatched} of "
+                f"{stats.rows} stock rows have no matching product"
+            )
+        return changed
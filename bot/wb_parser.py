@@ -1,23 +1,91 @@
+import asyncio
 import datetime
 import json
 import logging
+import random
+import time
+from contextlib import asynccontextmanager
+from enum import Enum
 from http import HTTPStatus
-from typing import Any
+from typing import Any, AsyncIterator
 
 import aiohttp
+import ijson
+
+from config_data.config import WildberriesAPIConfig
+from metrics import WB_REQUEST_SECONDS, WB_RESPONSES, WB_STREAM_SECONDS
+from profiling import record_wb_request
+from rate_limit import TokenBucket
+from timestamps import wb_timestamps
 
 logger = logging.getLogger(__name__)
 
+MAX_RETRIES = 5
+BACKOFF_BASE = 1
+BACKOFF_MAX = 60
+
+
+class WildberriesAPI(Enum):
+    """
+    Семейства API Wildberries: лимит запросов в секунду и допустимый всплеск
+    для одного токена
+    """
+
+    CONTENT = (100 / 60, 5)
+    STATISTICS = (1 / 60, 1)
+    MARKETPLACE = (300 / 60, 10)
+
+
+class WildberriesAPIError(Exception):
+    def __init__(self, status: int | None, message: str):
+        super().__init__(f"Status: {status}, message: {message}")
+        self.status = status
+        self.message = message
+
+
+class WildberriesUnauthorizedError(WildberriesAPIError):
+    pass
+
+
+class WildberriesRateLimitError(WildberriesAPIError):
+    pass
+
+
+_limiters: dict[tuple[str, WildberriesAPI], TokenBucket] = {}
+
+
+def get_limiter(api_token: str, api: WildberriesAPI) -> TokenBucket:
+    """
+    Общий для процесса ограничитель запросов токена к семейству API
+    """
+    limiter = _limiters.get((api_token, api))
+    if limiter is None:
+        rate, capacity = api.value
+        limiter = _limiters[(api_token, api)] = TokenBucket(rate, capacity)
+    return limiter
+
 
 class WBParser:
     def __init__(
         self,
         api_token: str,
+        client: aiohttp.ClientSession,
+        api_config: WildberriesAPIConfig | None = None,
     ):
         self._api_token = api_token
-        self.client = aiohttp.ClientSession()
+        self.client = client
+        self._api_config = api_config or WildberriesAPIConfig()
 
-    async def __request(self, *args, **kwargs):
+    @asynccontextmanager
+    async def __request(
+        self, api: WildberriesAPI, *args, **kwargs
+    ) -> AsyncIterator[aiohttp.ClientResponse]:
+        """
+        Запрос с соблюдением лимитов токена и повтором при 429, 5xx и
+        сетевых ошибках. Возвращает только успешный ответ, иначе
+        WildberriesAPIError. Время запроса замеряется до получения
+        заголовков ответа, без работы вызывающего с ответом
+        """
         headers = {
             "Accept": "*/*",
             "Authorization": self._api_token,
@@ -26,85 +94,185 @@ class WBParser:
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36",
         }
         kwargs["headers"] = headers
-        return await self.client.request(*args, **kwargs)
+        limiter = get_limiter(self._api_token, api)
+        attempt = 0
+        while True:
+            await limiter.acquire()
+            retry_after = None
+            started_at = time.perf_counter()
+            try:
+                response = await self.client.request(*args, **kwargs)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                WB_RESPONSES.labels(api.name.lower(), "error").inc()
+                error = WildberriesAPIError(None, repr(e))
+            else:
+                WB_RESPONSES.labels(api.name.lower(), response.status).inc()
+                if response.status == HTTPStatus.OK:
+                    elapsed = time.perf_counter() - started_at
+                    WB_REQUEST_SECONDS.labels(api.name.lower()).observe(
+                        elapsed
+                    )
+                    record_wb_request(elapsed)
+                    try:
+                        yield response
+                    finally:
+                        response.release()
+                    return
+                error = self.__error(response.status, await response.text())
+                retry_after = self.__retry_after(response)
+                response.release()
+            record_wb_request(time.perf_counter() - started_at)
+            retryable = error.status is None or (
+                error.status == HTTPStatus.TOO_MANY_REQUESTS
+                or error.status >= HTTPStatus.INTERNAL_SERVER_ERROR
+            )
+            if not retryable or attempt >= MAX_RETRIES:
+                raise error
+            delay = retry_after or random.uniform(
+                0, min(BACKOFF_MAX, BACKOFF_BASE * 2**attempt)
+            )
+            if error.status == HTTPStatus.TOO_MANY_REQUESTS:
+                limiter.pause(delay, refund=retry_after is not None)
+            limiter_wait = limiter.wait_time(delay)
+            logger.warning(
+                f"{api.name} API: {error}, retry in {delay:.1f}s"
+                + (
+                    f" and {limiter_wait:.1f}s more for the rate limit"
+                    if limiter_wait >= 0.1
+                    else ""
+                )
+            )
+            attempt += 1
+            await asyncio.sleep(delay)
+
+    @staticmethod
+    def __error(status: int, message: str) -> WildberriesAPIError:
+        if status == HTTPStatus.UNAUTHORIZED:
+            return WildberriesUnauthorizedError(status, message)
+        if status == HTTPStatus.TOO_MANY_REQUESTS:
+            return WildberriesRateLimitError(status, message)
+        return WildberriesAPIError(status, message)
+
+    @staticmethod
+    def __retry_after(response: aiohttp.ClientResponse) -> float | None:
+        for header in ("X-Ratelimit-Retry", "Retry-After"):
+            value = response.headers.get(header)
+            if value:
+                try:
+                    return float(value)
+                except ValueError:
+                    continue
+        return None
 
     async def check_token(self) -> bool:
         """
         Проверка токена
         """
         try:
-            url = "https://suppliers-api.wildberries.ru/api/v3/offices"
-            response = await self.__request("GET", url)
-            if response.status != HTTPStatus.OK:
-                raise Exception(
-                    f"Failed to get data, status: {response.status}\n"
-                    f"Message: {await response.json()}"
-                )
-            return True
-        except Exception as e:
+            url = f"{self._api_config.suppliers_url}/api/v3/offices"
+            async with self.__request(WildberriesAPI.MARKETPLACE, "GET", url):
+                return True
+        except WildberriesAPIError as e:
             logger.error(e)
             return False
 
-    async def get_products(self) -> list[Any]:
+    async def iter_products(
+        self, updated_since: datetime.datetime | None = None
+    ) -> AsyncIterator[tuple[list[Any], list[datetime.datetime | None]]]:
         """
-        Парсинг информации о товарах продавцов
+        Парсинг информации о товарах продавцов постранично, от последних
+        измененных карточек к более ранним. Каждая страница отдается
+        вместе с разобранными датами updatedAt карточек. Если указан
+        updated_since, загрузка останавливается на первой карточке,
+        измененной раньше
         """
-        products_data = []
-        try:
-            url = "https://suppliers-api.wildberries.ru/content/v2/get/cards/list"
-            payload = {
-                "settings": {
-                    "filter": {"withPhoto": -1},
-                    "cursor": {"limit": 1000},
-                }
+        url = f"{self._api_config.suppliers_url}/content/v2/get/cards/list"
+        payload = {
+            "settings": {
+                "sort": {"ascending": False},
+                "filter": {"withPhoto": -1},
+                "cursor": {"limit": 1000},
             }
-            while True:
-                response = await self.__request(
-                    "POST", url, data=json.dumps(payload)
-                )
-                if response.status != HTTPStatus.OK:
-                    raise Exception(
-                        f"Failed to get data, status: {response.status} \n"
-                        f"Message: {await response.json()}"
-                    )
+        }
+        while True:
+            async with self.__request(
+                WildberriesAPI.CONTENT, "POST", url, data=json.dumps(payload)
+            ) as response:
                 data = await response.json()
-                product_data = data.get("cards")
-                if product_data:
-                    products_data.extend(product_data)
-                    if (
-                        data.get("cursor").get("total")
-                        >= payload["settings"]["cursor"]["limit"]
-                    ):
-                        payload["settings"]["cursor"]["nmID"] = data.get(
-                            "cursor"
-                        ).get("nmID")
-                        payload["settings"]["cursor"]["updatedAt"] = data.get(
-                            "cursor"
-                        ).get("updatedAt")
-                    else:
-                        break
-                else:
+            product_data = data.get("cards")
+            if not product_data:
+                break
+            updated_at = wb_timestamps.parse_column(
+                "updatedAt",
+                (product.get("updatedAt") for product in product_data),
+            )
+            if updated_since:
+                changed_data, changed_updated_at = [], []
+                for product, product_updated_at in zip(
+                    product_data, updated_at
+                ):
+                    if (product_updated_at or updated_since) >= updated_since:
+                        changed_data.append(product)
+                        changed_updated_at.append(product_updated_at)
+                if changed_data:
+                    yield changed_data, changed_updated_at
+                if len(changed_data) < len(product_data):
                     break
-        except Exception as e:
-            logger.error(e)
-
-        return products_data
+            else:
+                yield product_data, updated_at
+            cursor = data.get("cursor")
+            if cursor.get("total") < payload["settings"]["cursor"]["limit"]:
+                break
+            payload["settings"]["cursor"]["nmID"] = cursor.get("nmID")
+            payload["settings"]["cursor"]["updatedAt"] = cursor.get(
+                "updatedAt"
+            )
 
-    async def get_warehouses_stocks(
+    @asynccontextmanager
+    async def open_warehouses_stocks(
         self, date: datetime.date = "2019-06-20"
-    ) -> list[Any]:
+    ) -> AsyncIterator[AsyncIterator[dict[str, Any]]]:
+        """
+        Запрос информации об остатках товаров продавца на складах. Вход в
+        контекст ждет лимитов и повторов до успешного ответа, затем
+        отдает поток строк, которые разбираются по одной по мере чтения
+        тела ответа
+        """
+        url = f"{self._api_config.statistics_url}/api/v1/supplier/stocks"
+        async with self.__request(
+            WildberriesAPI.STATISTICS, "GET", url, params={"dateFrom": date}
+        ) as response:
+            yield self.__iter_items(WildberriesAPI.STATISTICS, response)
+
+    @staticmethod
+    async def __iter_items(
+        api: WildberriesAPI, response: aiohttp.ClientResponse
+    ) -> AsyncIterator[dict[str, Any]]:
         """
-        Парсинг информации о остатках товарах продавца на складе
+        Разбор элементов массива из тела ответа по мере чтения. Время
+        чтения и разбора учитывается отдельно от запроса и без времени,
+        пока вызывающий обрабатывает полученные строки
         """
+        items = ijson.items(
+            response.content, "item", use_float=True
+        ).__aiter__()
+        elapsed = 0.0
         try:
-            url = f"https://statistics-api.wildberries.ru/api/v1/supplier/stocks?dateFrom={date}"
-            response = await self.__request("GET", url)
-            if response.status != HTTPStatus.OK:
-                raise Exception(
-                    f"Failed to get data, status: {response.status} \n"
-                    f"Message: {await response.json()}"
-                )
-            data = await response.json()
-            return data
-        except Exception as e:
-            logger.error(e)
+            while True:
+                started_at = time.perf_counter()
+                try:
+                    item = await items.__anext__()
+                except StopAsyncIteration:
+                    break
+                finally:
+                    elapsed += time.perf_counter() - started_at
+                yield item
+        except (
+            aiohttp.ClientError,
+            asyncio.TimeoutError,
+            ijson.JSONError,
+        ) as e:
+            raise WildberriesAPIError(None, repr(e))
+        finally:
+            WB_STREAM_SECONDS.labels(api.name.lower()).observe(elapsed)
+            record_wb_request(elapsed, requests=0)